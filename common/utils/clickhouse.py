@@ -7,16 +7,39 @@ connection method. It centralizes error handling and resource management.
 """
 
 import contextlib
-from loguru import logger
+import functools
+import itertools
+import os
+from collections.abc import Iterator, Sequence
 
 import clickhouse_connect
+import pandas as pd
+from clickhouse_connect.driver.httputil import check_env_proxy, get_pool_manager
 from django.conf import settings
+from loguru import logger
 
 # Default ClickHouse connection settings
 # These are fallbacks and should ideally be configured in Django's settings.
 DEFAULT_CLICKHOUSE_HOST = "localhost"
 DEFAULT_CLICKHOUSE_USER = "default"
 DEFAULT_CLICKHOUSE_PASSWORD = ""
+# clickhouse_connect's default HTTP port, used to match the host against NO_PROXY
+DEFAULT_CLICKHOUSE_HTTP_PORT = 8123
+DEFAULT_CLICKHOUSE_POOL_SIZE = 25
+# Rows per DataFrame yielded by query_dataframe_chunks
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+@functools.cache
+def _get_pool_manager(pid: int, pool_size: int, http_proxy: str | None = None):
+    """
+    Returns the HTTP connection pool shared by all ClickHouse clients of a process.
+
+    The pool is keyed by PID so forked workers (Celery prefork, gunicorn) never reuse
+    sockets inherited from their parent. When an HTTP proxy applies, the pool is a proxy
+    manager for it, as clickhouse_connect would build without an explicit pool.
+    """
+    return get_pool_manager(maxsize=pool_size, http_proxy=http_proxy)
 
 
 @contextlib.contextmanager
@@ -26,7 +49,9 @@ def get_clickhouse_client(readonly: int = 1):
 
     This context manager handles the creation and teardown of the ClickHouse
     client, including fetching credentials from Django settings and ensuring
-    the connection is always closed.
+    the client is always closed. HTTP connections come from a per-process pool
+    sized by CLICKHOUSE_POOL_SIZE and are reused across clients. HTTP_PROXY and
+    NO_PROXY from the environment are honored as by clickhouse_connect itself.
 
     Args:
         readonly (int, optional): Whether to open the connection in read-only mode (1) or not (0). Defaults to 1.
@@ -48,7 +73,20 @@ def get_clickhouse_client(readonly: int = 1):
     user = getattr(settings, "CLICKHOUSE_USER", DEFAULT_CLICKHOUSE_USER)
     password = getattr(settings, "CLICKHOUSE_PASSWORD", DEFAULT_CLICKHOUSE_PASSWORD)
 
-    client = clickhouse_connect.get_client(host=host, username=user, password=password, settings={"readonly": readonly})
+    pool_size = getattr(settings, "CLICKHOUSE_POOL_SIZE", DEFAULT_CLICKHOUSE_POOL_SIZE)
+
+    # Passing pool_mgr skips clickhouse_connect's own HTTP_PROXY/NO_PROXY lookup, so do it here
+    http_proxy = check_env_proxy("http", host, DEFAULT_CLICKHOUSE_HTTP_PORT)
+
+    # Clients check connections out of a shared pool, so closing a client keeps the
+    # underlying keep-alive connections open for the next one
+    client = clickhouse_connect.get_client(
+        host=host,
+        username=user,
+        password=password,
+        settings={"readonly": readonly},
+        pool_mgr=_get_pool_manager(os.getpid(), pool_size, http_proxy),
+    )
     logger.debug(f"Connecting to ClickHouse at {host}...")
 
     try:
@@ -59,3 +97,28 @@ def get_clickhouse_client(readonly: int = 1):
     finally:
         client.close()
         logger.debug("ClickHouse client disconnected.")
+
+
+def query_dataframe_chunks(
+    client, query: str, columns: Sequence[str], params: dict | None = None, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream a query result as DataFrames of at most `chunk_size` rows.
+
+    Rows are read with `query_row_block_stream`, so only about one chunk is held in memory at a time
+    instead of the whole result set. The server sends blocks of up to `chunk_size` rows and they are
+    regrouped into exact chunks. The client must stay open until the iterator is exhausted.
+
+    Args:
+        client: An open ClickHouse client
+        query: The SQL query to run
+        columns: Column names of the selected expressions, in order
+        params: Query parameters
+        chunk_size: Maximum number of rows per DataFrame
+
+    Yields:
+        pd.DataFrame: The next chunk of rows
+    """
+    with client.query_row_block_stream(query, parameters=params, settings={"max_block_size": chunk_size}) as stream:
+        for batch in itertools.batched(itertools.chain.from_iterable(stream), chunk_size):
+            yield pd.DataFrame.from_records(batch, columns=columns)
@@ -4,23 +4,102 @@ Excel utilities.
 This module provides utility functions for creating and saving Excel workbooks.
 """
 
+import datetime
+import functools
+import io
 import logging
 import os
+from collections.abc import Iterable, Sequence
+from typing import Any
+from zipfile import ZIP_DEFLATED, ZipFile
 
 from django.conf import settings
 from openpyxl import Workbook
+from openpyxl.writer.excel import ExcelWriter
 
 logger = logging.getLogger(__name__)
 
+# Deflate level for generated .xlsx archives; see save_workbook_to_buffer
+EXPORT_COMPRESSION_LEVEL = 1
 
-def create_workbook():
+
+@functools.lru_cache(maxsize=8)
+def _ensure_exports_dir(media_root: str) -> str:
+    export_dir = os.path.join(media_root, "exports")
+    os.makedirs(export_dir, exist_ok=True)
+    return export_dir
+
+
+def get_exports_dir() -> str:
+    """
+    Get the exports directory under MEDIA_ROOT.
+
+    The directory is created once per MEDIA_ROOT value; later calls only do a cache lookup.
+
+    Returns:
+        str: Path to the exports directory
+    """
+    return _ensure_exports_dir(str(settings.MEDIA_ROOT))
+
+
+def create_workbook(write_only: bool = False):
     """
     Create a new Excel workbook.
 
+    Args:
+        write_only: Create a write-only workbook that streams appended rows instead of keeping
+            every cell in memory. Such a workbook has no active sheet and can only be saved once.
+
     Returns:
         Workbook: A new Excel workbook
     """
-    return Workbook()
+    return Workbook(write_only=write_only)
+
+
+def write_rows(wb: Workbook, rows: Iterable[Sequence[Any]]) -> None:
+    """
+    Write rows of plain values to the workbook in a single pass.
+
+    Rows go to the active sheet, or to a newly created sheet for write-only workbooks. They are
+    appended in order, so the first row is typically the header. Appending whole rows avoids the
+    per-cell lookup overhead of ``sheet.cell(row=..., column=...)``.
+
+    Args:
+        wb: The workbook to write to
+        rows: An iterable of row value sequences
+    """
+    sheet = wb.create_sheet() if wb.write_only else wb.active
+    for row in rows:
+        sheet.append(row)
+
+
+def save_workbook_to_buffer(wb: Workbook, compresslevel: int = EXPORT_COMPRESSION_LEVEL) -> io.BytesIO:
+    """
+    Serialize workbook into an in-memory buffer.
+
+    This mirrors ``Workbook.save`` but lets the caller pick the deflate level of the .xlsx archive.
+    The default favors speed: exports are transient files, and level 1 is several times faster
+    than zlib's default level at the cost of a slightly larger file.
+
+    Args:
+        wb: The workbook to serialize
+        compresslevel: Deflate level (0-9) used for the archive members
+
+    Returns:
+        io.BytesIO: Buffer with the .xlsx content, positioned at the start
+    """
+    if not wb:
+        raise ValueError("Workbook cannot be None")
+
+    if wb.write_only and not wb.worksheets:
+        wb.create_sheet()
+
+    buffer = io.BytesIO()
+    archive = ZipFile(buffer, "w", ZIP_DEFLATED, allowZip64=True, compresslevel=compresslevel)
+    wb.properties.modified = datetime.datetime.now(tz=datetime.UTC).replace(tzinfo=None)
+    ExcelWriter(wb, archive).save()
+    buffer.seek(0)
+    return buffer
 
 
 def save_workbook(wb: Workbook, filename: str) -> str:
@@ -40,11 +119,11 @@ def save_workbook(wb: Workbook, filename: str) -> str:
         raise ValueError("Filename cannot be empty")
 
     filename = os.path.basename(filename)
-    export_dir = os.path.join(settings.MEDIA_ROOT, "exports")
-    os.makedirs(export_dir, exist_ok=True)
-
-    file_path = os.path.join(export_dir, filename)
-    wb.save(file_path)
+    file_path = os.path.join(get_exports_dir(), filename)
+    # Build the archive in memory and flush it to disk with a single write
+    buffer = save_workbook_to_buffer(wb)
+    with open(file_path, "wb", buffering=1024 * 1024) as f:
+        f.write(buffer.getbuffer())
 
     # Ensure forward slashes for URLs regardless of OS
     url = f"{settings.MEDIA_URL}exports/{filename}"
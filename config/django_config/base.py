@@ -164,6 +164,7 @@ ACCOUNT_UNIQUE_EMAIL = True
 CLICKHOUSE_HOST = env("CLICKHOUSE_HOST", default="localhost")
 CLICKHOUSE_USER = env("CLICKHOUSE_USER", default="default")
 CLICKHOUSE_PASSWORD = env("CLICKHOUSE_PASSWORD", default="")
+CLICKHOUSE_POOL_SIZE = env.int("CLICKHOUSE_POOL_SIZE", default=25)
 
 # Celery settings
 CELERY_BROKER_URL = env("CELERY_BROKER_URL", default="redis://localhost:6378/0")
@@ -173,6 +174,8 @@ CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = "Europe/Moscow"
 CELERY_TASK_TRACK_STARTED = True
+# Reserve one task at a time so a long-running task doesn't hold queued tasks other workers could take
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
 # CELERY_TASK_TIME_LIMIT = 30 * 60  # 30 minutes
 
 # Link
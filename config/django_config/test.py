@@ -14,3 +14,6 @@ DATABASES = {
         "NAME": ":memory:",
     }
 }
+
+# Password hashing strength is irrelevant in tests; PBKDF2 only slows down create_user()
+PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
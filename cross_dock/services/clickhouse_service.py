@@ -6,6 +6,7 @@ It implements a context manager pattern for proper resource management and
 includes error handling with detailed logging.
 """
 
+import itertools
 import logging
 
 import pandas as pd
@@ -16,6 +17,72 @@ from common.utils.clickhouse import get_clickhouse_client
 logger = logging.getLogger(__name__)
 
 DAYS_LOOKBACK = 2
+# (brand, sku) pairs per batch query. The pairs are inlined into the SQL as an IN literal, and a few
+# thousand of them (~26 bytes each) keep the query well below ClickHouse's default max_query_size (256 KiB).
+PAIRS_PER_QUERY = 2000
+
+
+SUPPLIER_DATA_COLUMNS = ["price", "quantity", "supplier_name"]
+BATCH_SUPPLIER_DATA_COLUMNS = [*SUPPLIER_DATA_COLUMNS, "brand_lower", "sku_lower"]
+
+# Explicit column dtypes so result frames are built from typed buffers instead of inferred object arrays.
+# Quantity is nullable because offers without stock information can come back as NULL.
+# Supplier names repeat across many SKUs, so they are dictionary-encoded as a categorical.
+RESULT_DTYPES = {
+    "price": "float64",
+    "quantity": "Int64",
+    "supplier_name": "category",
+    "brand_lower": "string",
+    "sku_lower": "string",
+}
+
+# Hyundai/Kia offers can appear under multiple brand names; they are all matched under a single key
+HYUNDAI_KIA_ALIASES = ["hyundai/kia", "hyundai/kia/mobis"]
+HYUNDAI_KIA_KEY = "hyundai/kia"
+
+
+def _build_result_df(rows: list[tuple], columns: list[str]) -> pd.DataFrame:
+    """Build a result DataFrame from ClickHouse rows with explicit column dtypes."""
+    return pd.DataFrame.from_records(rows, columns=columns).astype(
+        {column: RESULT_DTYPES[column] for column in columns}
+    )
+
+
+# Typed empty result, built once and handed out as shallow copies
+_EMPTY_BATCH_DF = _build_result_df([], BATCH_SUPPLIER_DATA_COLUMNS)
+
+
+def brand_sku_key(brand: str, sku: str) -> tuple[str, str]:
+    """
+    Normalize a (brand, sku) pair the same way query_supplier_data_batch does on the ClickHouse side.
+
+    Args:
+        brand: Product brand
+        sku: Product SKU
+
+    Returns:
+        tuple: (brand_lower, sku_lower) matching the key columns returned by query_supplier_data_batch
+    """
+    brand_lower = str(brand).strip().lower()
+    if brand_lower in HYUNDAI_KIA_ALIASES:
+        brand_lower = HYUNDAI_KIA_KEY
+    return brand_lower, str(sku).strip().lower()
+
+
+def brand_sku_keys(brands: pd.Series, skus: pd.Series) -> tuple[pd.Series, pd.Series]:
+    """
+    Vectorized brand_sku_key() for whole input columns.
+
+    Args:
+        brands: Product brands
+        skus: Product SKUs
+
+    Returns:
+        tuple: (brand_lower, sku_lower) Series aligned with the inputs
+    """
+    brand_lower = brands.astype(str).str.strip().str.lower()
+    brand_lower = brand_lower.replace(dict.fromkeys(HYUNDAI_KIA_ALIASES, HYUNDAI_KIA_KEY))
+    return brand_lower, skus.astype(str).str.strip().str.lower()
 
 
 def query_supplier_data(brand: str, sku: str, supplier_list: str, days_lookback: int = DAYS_LOOKBACK) -> pd.DataFrame:
@@ -31,133 +98,128 @@ def query_supplier_data(brand: str, sku: str, supplier_list: str, days_lookback:
     Returns:
         DataFrame with supplier data sorted by price (price, quantity, supplier_name)
         Limited to 3 suppliers maximum
-
-    Raises:
-        Exception: If there's an error executing the query
     """
     logger.info(
         f"Querying supplier data for {brand}/{sku} with supplier list {supplier_list}, days_lookback={days_lookback}"
     )
+    result_df = query_supplier_data_batch([(brand, sku)], supplier_list, days_lookback=days_lookback)
+    logger.info(f"Found {len(result_df)} supplier results for {brand}/{sku}")
+    return result_df[SUPPLIER_DATA_COLUMNS].reset_index(drop=True)
+
+
+def query_supplier_data_batch(
+    brand_sku_pairs: list[tuple[str, str]], supplier_list: str, days_lookback: int = DAYS_LOOKBACK
+) -> pd.DataFrame:
+    """
+    Query ClickHouse for supplier data for a batch of (brand, sku) pairs.
+
+    The supplier list lookup is folded into the price query, and Hyundai/Kia brand aliases are
+    normalized on the ClickHouse side, so the returned key columns match brand_sku_key().
+    Pairs are sent PAIRS_PER_QUERY at a time over one client. If any of these queries fails, the
+    whole result is empty rather than partially filled.
+
+    Args:
+        brand_sku_pairs: List of (brand, sku) tuples; they are normalized with brand_sku_key()
+        supplier_list: Supplier list to query (e.g., 'Группа для проценки ТРЕШКА', 'ОПТ-2')
+        days_lookback: Number of days to look back for supplier data (default: DAYS_LOOKBACK)
+
+    Returns:
+        DataFrame with columns: price, quantity, supplier_name, brand_lower, sku_lower
+        Contains up to 3 suppliers per (brand, sku) pair, sorted by price
+    """
+    empty_df = _EMPTY_BATCH_DF.copy(deep=False)
+
+    pairs = sorted({brand_sku_key(brand, sku) for brand, sku in brand_sku_pairs})
+    if not pairs:
+        logger.warning("No (brand, sku) pairs provided.")
+        return empty_df
 
     host = getattr(settings, "CLICKHOUSE_HOST", "localhost")
     user = getattr(settings, "CLICKHOUSE_USER", "default")
-    logger.info(f"Using ClickHouse connection: host={host}, user={user}")
-
-    empty_df = pd.DataFrame(columns=["price", "quantity", "supplier_name"])
+    logger.info(
+        f"Querying supplier data for {len(pairs)} (brand, sku) pairs with supplier list {supplier_list}, "
+        f"days_lookback={days_lookback} (host={host}, user={user})"
+    )
 
-    try:
-        try:
-            with get_clickhouse_client() as client:
-                suppliers_query = """
-                SELECT DISTINCT dif_id
-                FROM sup_stat.sup_list
-                WHERE has(lists, %(supplier_list)s)
-                """
-                logger.info(f"Executing suppliers query with supplier_list={supplier_list}")
-                suppliers_result = client.execute(suppliers_query, {"supplier_list": supplier_list})
-                logger.info(f"Found {len(suppliers_result)} suppliers for supplier list {supplier_list}")
-        except Exception as e:
-            logger.error(f"Error executing suppliers query: {e}")
-            # Try a simpler query to test the connection
-            try:
-                with get_clickhouse_client() as client:
-                    test_query = "SELECT 1"
-                    test_result = client.execute(test_query)
-                    logger.info(f"Test query result: {test_result}")
-            except Exception as test_e:
-                logger.error(f"Error executing test query: {test_e}")
-            return empty_df
-
-        if not suppliers_result:
-            logger.warning(f"No suppliers found for supplier list {supplier_list}")
-            return empty_df
-
-        supplier_ids = [item[0] for item in suppliers_result]
-
-        # Special handling for Hyundai/Kia brands which can appear under multiple names
-        if brand.lower() in ["hyundai/kia/mobis", "hyundai/kia"]:
-            brand_values = ["hyundai/kia", "hyundai/kia/mobis"]
-        else:
-            brand_values = [brand.lower()]
-
-        # For a given brand, SKU, and supplier list, return up to 3 suppliers with the lowest prices,
-        # using only their most recent offer, and only if the offer is recent and has positive quantity.
-        price_query = """
-        WITH recent_prices AS (
-            SELECT DISTINCT
-                df.p as price,
-                df.q as quantity,
-                sl.name as supplier_name,
-                df.dateupd,
-                ROW_NUMBER() OVER (PARTITION BY sl.name ORDER BY df.dateupd DESC) AS rn
-            FROM
-                sup_stat.dif_step_1 AS df
-            INNER JOIN
-                sup_stat.sup_list AS sl
-            ON
-                df.supid = sl.dif_id
-            WHERE
-                lower(df.a) = %(sku_lower)s
-                AND lower(df.b) IN %(brand_values)s
-                AND df.dateupd >= now() - interval %(days_lookback)s day
-                AND df.supid IN %(supplier_ids)s
-                AND df.q > 0
-        ),
-        ranked_suppliers AS (
-            SELECT DISTINCT
-                price,
-                quantity,
-                supplier_name,
-                ROW_NUMBER() OVER (PARTITION BY supplier_name ORDER BY price ASC) AS rank
-            FROM recent_prices
-            WHERE rn = 1
-        )
+    # For every (brand, sku) pair, return up to 3 suppliers from the supplier list with the lowest prices,
+    # using only their most recent offer, and only if the offer is recent and has positive quantity.
+    query = """
+    WITH supplier_ids AS (
+        SELECT DISTINCT dif_id
+        FROM sup_stat.sup_list
+        WHERE has(lists, %(supplier_list)s)
+    ),
+    recent_prices AS (
         SELECT
-            price,
-            quantity,
-            supplier_name
+            df.p AS price,
+            df.q AS quantity,
+            sl.name AS supplier_name,
+            if(lower(df.b) IN %(hyundai_kia_aliases)s, %(hyundai_kia_key)s, lower(df.b)) AS brand_lower,
+            lower(df.a) AS sku_lower,
+            ROW_NUMBER() OVER (
+                PARTITION BY brand_lower, sku_lower, sl.name
+                ORDER BY df.dateupd DESC
+            ) AS rn
         FROM
-            ranked_suppliers
+            sup_stat.dif_step_1 AS df
+        INNER JOIN
+            sup_stat.sup_list AS sl
+        ON
+            df.supid = sl.dif_id
         WHERE
-            rank = 1
-        ORDER BY
-            price ASC
-        LIMIT 3;
-        """
-
-        query_params = {
-            "sku_lower": sku.lower(),
-            "brand_values": brand_values,
-            "supplier_ids": supplier_ids,
-            "days_lookback": days_lookback,
-        }
+            (brand_lower, sku_lower) IN %(brand_sku_pairs)s
+            AND df.dateupd >= now() - interval %(days_lookback)s day
+            AND df.supid IN (SELECT dif_id FROM supplier_ids)
+            AND df.q > 0
+    )
+    SELECT
+        price,
+        quantity,
+        supplier_name,
+        brand_lower,
+        sku_lower
+    FROM (
+        SELECT
+            price,
+            quantity,
+            supplier_name,
+            brand_lower,
+            sku_lower,
+            ROW_NUMBER() OVER (
+                PARTITION BY brand_lower, sku_lower
+                ORDER BY price ASC, supplier_name
+            ) AS rank
+        FROM recent_prices
+        WHERE rn = 1
+    )
+    WHERE rank <= 3
+    ORDER BY brand_lower, sku_lower, price ASC, supplier_name;
+    """
 
-        try:
-            with get_clickhouse_client() as client:
-                logger.info(
-                    f"Executing price query with params: sku={sku.lower()}, brands={brand_values}, supplier_count={len(supplier_ids)}, days_lookback={days_lookback}, limit=3"
-                )
-                result = client.execute(price_query, query_params)
-                logger.info(f"Query executed successfully, got {len(result)} results")
-        except Exception as e:
-            logger.error(f"Error executing price query: {e}")
-            logger.warning("Returning empty results due to query error")
-            return empty_df
+    query_params = {
+        "supplier_list": supplier_list,
+        "hyundai_kia_aliases": HYUNDAI_KIA_ALIASES,
+        "hyundai_kia_key": HYUNDAI_KIA_KEY,
+        "days_lookback": days_lookback,
+    }
 
-        if result:
-            result_df = pd.DataFrame(result, columns=["price", "quantity", "supplier_name"])
-            logger.info(f"Created DataFrame with {len(result_df)} rows")
-            logger.info(f"First few results: \n{result_df.head()}")
-        else:
-            result_df = empty_df
-            logger.warning(f"No results found for {brand}/{sku} with supplier list {supplier_list}")
+    result = []
+    try:
+        with get_clickhouse_client() as client:
+            for batch in itertools.batched(pairs, PAIRS_PER_QUERY):
+                result.extend(client.execute(query, {**query_params, "brand_sku_pairs": list(batch)}))
+            logger.info(f"Query executed successfully, got {len(result)} results")
+    except Exception as e:
+        logger.exception(f"Error querying supplier data in batch: {e}")
+        return empty_df
 
-        logger.info(f"Found {len(result_df)} supplier results for {brand}/{sku}")
-        return result_df
+    if not result:
+        logger.warning(f"No results found for batch query with supplier list {supplier_list}")
+        return empty_df
 
-    except Exception as e:
-        logger.exception(f"Error querying supplier data: {e}")
-        raise
+    result_df = _build_result_df(result, BATCH_SUPPLIER_DATA_COLUMNS)
+    logger.info(f"Created DataFrame with {len(result_df)} rows")
+    return result_df
 
 
 def query_supplier_data_mv(
@@ -178,7 +240,7 @@ def query_supplier_data_mv(
     logger.info(
         f"[MV-BATCH] Querying supplier data for {len(brand_sku_pairs)} (brand, sku) pairs with supplier list {supplier_list}, days_lookback={days_lookback}"
     )
-    empty_df = pd.DataFrame(columns=["price", "quantity", "supplier_name", "brand_lower", "sku_lower"])
+    empty_df = _EMPTY_BATCH_DF.copy(deep=False)
 
     if not brand_sku_pairs:
         logger.warning("[MV-BATCH] No (brand, sku) pairs provided.")
@@ -236,17 +298,19 @@ def query_supplier_data_mv(
 
         query_params = {
             "supplier_list": supplier_list,
-            "brand_sku_pairs": brand_sku_pairs,
             "days_lookback": days_lookback,
         }
 
+        result = []
         with get_clickhouse_client() as client:
             logger.info(f"[MV-BATCH] Executing batch MV query for {len(brand_sku_pairs)} pairs.")
-            result = client.execute(query, query_params)
+            # Same IN literal size limit as query_supplier_data_batch
+            for batch in itertools.batched(brand_sku_pairs, PAIRS_PER_QUERY):
+                result.extend(client.execute(query, {**query_params, "brand_sku_pairs": list(batch)}))
             logger.info(f"[MV-BATCH] Query executed successfully, got {len(result)} results")
 
         if result:
-            result_df = pd.DataFrame(result, columns=["price", "quantity", "supplier_name", "brand_lower", "sku_lower"])
+            result_df = _build_result_df(result, BATCH_SUPPLIER_DATA_COLUMNS)
             logger.info(f"[MV-BATCH] Created DataFrame with {len(result_df)} rows")
         else:
             result_df = empty_df
@@ -4,26 +4,126 @@ Excel service for cross-dock functionality.
 This module provides functions for processing cross-dock data and generating Excel files.
 """
 
+import itertools
 import logging
 import os
+import sys
+import time
 import uuid
+from collections.abc import Callable, Iterable, Iterator
 
+import numpy as np
 import pandas as pd
-from django.conf import settings
 
-from common.utils.excel import create_workbook, save_workbook
+from common.utils.excel import create_workbook, get_exports_dir, save_workbook, write_rows
 
 logger = logging.getLogger(__name__)
 
+HEADERS = (
+    "SKU",
+    "Бренд",
+    "Артикул",
+    "Лучшая цена 1",
+    "Количество 1",
+    "Название поставщика 1",
+    "Лучшая цена 2",
+    "Количество 2",
+    "Название поставщика 2",
+    "Лучшая цена 3",
+    "Количество 3",
+    "Название поставщика 3",
+)
+BEST_OFFERS_COUNT = 3
+OFFER_FIELDS = ["price", "quantity", "supplier_name"]
+OFFER_COLUMNS = [f"{field}_{rank}" for rank in range(1, BEST_OFFERS_COUNT + 1) for field in OFFER_FIELDS]
+INPUT_COLUMNS = ["Бренд", "Артикул"]
+EMPTY_ROW = (None,) * len(HEADERS)
+# How many output rows are written between two progress callbacks
+PROGRESS_REPORT_EVERY = 1000
+
+ProgressCallback = Callable[[int, int], None]
+
+
+def _export_file_name() -> str:
+    """
+    Build a unique export file name that sorts by creation time.
+
+    The nanosecond timestamp prefix keeps the exports directory in chronological order by name,
+    and the random suffix avoids collisions between concurrent exports.
+    """
+    return f"cross_dock_{time.time_ns():020d}_{uuid.uuid4().hex[:8]}.xlsx"
+
+
+def _report_progress(rows: Iterable, total: int, callback: ProgressCallback | None) -> Iterator:
+    """Yield rows unchanged, calling ``callback(current, total)`` every PROGRESS_REPORT_EVERY rows and at the end."""
+    if callback is None:
+        yield from rows
+        return
+
+    current = 0
+    for current, row in enumerate(rows, start=1):
+        yield row
+        if current % PROGRESS_REPORT_EVERY == 0:
+            callback(current, total)
+    if current % PROGRESS_REPORT_EVERY:
+        callback(current, total)
+
+
+def _mv_keys(brands: pd.Series, articles: pd.Series) -> tuple[pd.Series, pd.Series]:
+    """Normalize brand/article columns to the key columns of the cross-dock materialized view."""
+    return brands.astype(str).str.strip().str.lower(), articles.astype(str).str.strip().str.lower()
+
+
+def _intern_column(values: pd.Series) -> np.ndarray:
+    """
+    Return the column as an object array where equal values share a single object.
+
+    Repeated strings then hit the shared-strings table lookups on identity instead of
+    comparing equal copies.
+    """
+    codes, uniques = pd.factorize(values.to_numpy(dtype=object), use_na_sentinel=False)
+    return uniques[codes]
+
+
+def _pivot_best_offers(batch_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Pivot the long (one offer per row) query result into one row of offer cells per (brand, sku) key.
 
-def process_cross_dock_data(data: list[dict[str, str]], supplier_list: str, use_mv: bool = False) -> tuple[str, str]:
+    Returns a frame with the brand_lower/sku_lower key columns followed by OFFER_COLUMNS: (price,
+    quantity, supplier name) for the best offers in query order (cheapest first). Missing offers are NaN.
+    """
+    key_columns = ["brand_lower", "sku_lower"]
+    if batch_df.empty:
+        return pd.DataFrame(columns=[*key_columns, *OFFER_COLUMNS])
+
+    # Query results are already ordered by price within each key, so the rank is the position in the group
+    offers = batch_df.assign(rank=batch_df.groupby(key_columns).cumcount())
+    offers = offers[offers["rank"] < BEST_OFFERS_COUNT]
+
+    wide = offers.pivot(index=key_columns, columns="rank", values=OFFER_FIELDS)
+    wide = wide.reindex(columns=[(field, rank) for rank in range(BEST_OFFERS_COUNT) for field in OFFER_FIELDS])
+    wide.columns = OFFER_COLUMNS
+    return wide.reset_index()
+
+
+def process_cross_dock_data(
+    data: list[dict[str, str]],
+    supplier_list: str,
+    use_mv: bool = False,
+    progress_callback: ProgressCallback | None = None,
+) -> tuple[str, str]:
     """
     Process cross-dock data and generate Excel file.
 
+    The output is assembled column by column (SKU, brand, article and the offer columns) and only
+    zipped into rows when it is written to the workbook.
+
     Args:
         data: List of dictionaries containing brand and article information
         supplier_list: Supplier list to query (e.g., 'Группа для проценки ТРЕШКА', 'ОПТ-2')
         use_mv: Whether to use the MV-based query (default: False)
+        progress_callback: Optional callable receiving (rows written, total rows) while the
+            workbook is written, every PROGRESS_REPORT_EVERY rows
 
     Returns:
         tuple: (progress percentage, file URL)
@@ -36,131 +136,79 @@ def process_cross_dock_data(data: list[dict[str, str]], supplier_list: str, use_
         sample = data[0]
         logger.debug(f"Sample record: {sample}")
 
-    wb = create_workbook()
-    result_sheet = wb.active
-
-    headers = [
-        "SKU",
-        "Бренд",
-        "Артикул",
-        "Лучшая цена 1",
-        "Количество 1",
-        "Название поставщика 1",
-        "Лучшая цена 2",
-        "Количество 2",
-        "Название поставщика 2",
-        "Лучшая цена 3",
-        "Количество 3",
-        "Название поставщика 3",
-    ]
+    error_count = 0
 
-    for col_num, header in enumerate(headers, start=1):
-        result_sheet.cell(row=1, column=col_num, value=header)
+    # Items without a brand or article still get a (blank) row so the output stays aligned with the input
+    is_valid = [INPUT_COLUMNS[0] in item and INPUT_COLUMNS[1] in item for item in data]
+    for row_num, (item, valid) in enumerate(zip(data, is_valid, strict=True), start=1):
+        if not valid:
+            logger.error(f"Missing brand/article in row {row_num}. Item keys: {item.keys()}")
+            error_count += 1
 
-    total_rows = len(data)
-    processed_rows = 0
-    error_count = 0
+    input_df = pd.DataFrame.from_records(
+        [item for item, valid in zip(data, is_valid, strict=True) if valid], columns=INPUT_COLUMNS
+    )
+    brands = input_df[INPUT_COLUMNS[0]]
+    articles = input_df[INPUT_COLUMNS[1]]
+
+    from cross_dock.services.clickhouse_service import (
+        brand_sku_keys,
+        query_supplier_data_batch,
+        query_supplier_data_mv,
+    )
 
     if use_mv:
-        # Extract all unique (brand, sku) pairs (normalized)
-        brand_sku_pairs = set()
-        for item in data:
-            try:
-                brand = str(item["Бренд"]).strip().lower()
-                article = str(item["Артикул"]).strip().lower()
-                brand_sku_pairs.add((brand, article))
-            except Exception as e:
-                logger.error(f"Error extracting brand/sku from item: {item}, error: {e}")
-        brand_sku_pairs = list(brand_sku_pairs)
-        # Query all at once
-        from cross_dock.services.clickhouse_service import query_supplier_data_mv
-
-        batch_df = query_supplier_data_mv(brand_sku_pairs, supplier_list)
-        # Build a lookup: (brand_lower, sku_lower) -> list of rows
-        batch_lookup = {}
-        for _, row in batch_df.iterrows():
-            key = (row["brand_lower"], row["sku_lower"])
-            batch_lookup.setdefault(key, []).append(row)
-
-    for row_num, item in enumerate(data, start=2):
-        try:
-            brand = item["Бренд"]
-            article = item["Артикул"]
-            if row_num % 100 == 0:
-                logger.info(f"Processing row {row_num - 1}/{total_rows}: {brand}, {article}")
-        except KeyError as e:
-            logger.error(f"KeyError in row {row_num - 1}: {e}. Item keys: {item.keys()}")
-            error_count += 1
-            for i in range(3):
-                col_offset = i * 3
-                for c in range(4, 7):
-                    result_sheet.cell(row=row_num, column=c + col_offset, value=None)
-            continue
-
-        sku = f"{brand}|{article}"
-        result_sheet.cell(row=row_num, column=1, value=sku)
-        result_sheet.cell(row=row_num, column=2, value=brand)
-        result_sheet.cell(row=row_num, column=3, value=article)
-        try:
-            if use_mv:
-                # Use batch lookup
-                key = (str(brand).strip().lower(), str(article).strip().lower())
-                price_rows = batch_lookup.get(key, [])
-                for i, price_row in enumerate(price_rows[:3]):
-                    price = price_row["price"]
-                    quantity = price_row["quantity"]
-                    supplier_name = price_row["supplier_name"]
-                    col_offset = i * 3
-                    result_sheet.cell(row=row_num, column=4 + col_offset, value=float(price))
-                    safe_qty = int(quantity) if pd.notna(quantity) else None
-                    result_sheet.cell(row=row_num, column=5 + col_offset, value=safe_qty)
-                    result_sheet.cell(row=row_num, column=6 + col_offset, value=str(supplier_name))
-                for i in range(len(price_rows), 3):
-                    col_offset = i * 3
-                    result_sheet.cell(row=row_num, column=4 + col_offset, value=None)
-                    result_sheet.cell(row=row_num, column=5 + col_offset, value=None)
-                    result_sheet.cell(row=row_num, column=6 + col_offset, value=None)
-            else:
-                from cross_dock.services.clickhouse_service import query_supplier_data
-
-                price_results = query_supplier_data(brand, article, supplier_list)
-                for i, (_, price_row) in enumerate(price_results.iterrows(), start=0):
-                    if i < 3:
-                        price = price_row["price"]
-                        quantity = price_row["quantity"]
-                        supplier_name = price_row["supplier_name"]
-                        col_offset = i * 3
-                        result_sheet.cell(row=row_num, column=4 + col_offset, value=float(price))
-                        safe_qty = int(quantity) if pd.notna(quantity) else None
-                        result_sheet.cell(row=row_num, column=5 + col_offset, value=safe_qty)
-                        result_sheet.cell(row=row_num, column=6 + col_offset, value=str(supplier_name))
-                for i in range(len(price_results), 3):
-                    col_offset = i * 3
-                    result_sheet.cell(row=row_num, column=4 + col_offset, value=None)
-                    result_sheet.cell(row=row_num, column=5 + col_offset, value=None)
-                    result_sheet.cell(row=row_num, column=6 + col_offset, value=None)
-        except Exception as e:
-            logger.error(f"Error processing row {row_num}: {e}")
-            error_count += 1
-            for i in range(3):
-                col_offset = i * 3
-                result_sheet.cell(row=row_num, column=4 + col_offset, value=None)
-                result_sheet.cell(row=row_num, column=5 + col_offset, value=None)
-                result_sheet.cell(row=row_num, column=6 + col_offset, value=None)
+        brand_lower, sku_lower = _mv_keys(brands, articles)
+        query_batch = query_supplier_data_mv
+    else:
+        brand_lower, sku_lower = brand_sku_keys(brands, articles)
+        query_batch = query_supplier_data_batch
+    keys_df = pd.DataFrame({"brand_lower": brand_lower, "sku_lower": sku_lower})
+
+    # Query all unique (brand, sku) pairs (normalized) at once
+    brand_sku_pairs = list(keys_df.drop_duplicates().itertuples(index=False, name=None))
+    best_offers = _pivot_best_offers(pd.DataFrame())
+    try:
+        best_offers = _pivot_best_offers(query_batch(brand_sku_pairs, supplier_list))
+    except Exception as e:
+        logger.error(f"Error querying supplier data for {len(brand_sku_pairs)} pairs: {e}")
+        error_count += 1
+
+    # Supplier names repeat across keys; intern them once per distinct key before they are spread over rows
+    for column in OFFER_COLUMNS[OFFER_FIELDS.index("supplier_name") :: len(OFFER_FIELDS)]:
+        best_offers[column] = best_offers[column].map(lambda name: sys.intern(str(name)), na_action="ignore")
 
-        processed_rows += 1
+    offers = keys_df.merge(best_offers, on=["brand_lower", "sku_lower"], how="left")[OFFER_COLUMNS]
+    offers = offers.astype(object).where(offers.notna(), None)
 
-    file_name = f"cross_dock_{uuid.uuid4()}.xlsx"
+    columns = [
+        (brands.astype(str) + "|" + articles.astype(str)).to_numpy(dtype=object),
+        _intern_column(brands),
+        articles.to_numpy(dtype=object),
+        *(offers[column].to_numpy() for column in OFFER_COLUMNS),
+    ]
+    valid_rows = zip(*columns, strict=True)
+    rows = (next(valid_rows) if valid else EMPTY_ROW for valid in is_valid)
+
+    wb = create_workbook(write_only=True)
+    write_rows(wb, itertools.chain([HEADERS], _report_progress(rows, len(is_valid), progress_callback)))
+
+    file_name = _export_file_name()
     logger.info(f"Saving workbook as {file_name}")
     file_url = save_workbook(wb, file_name)
     logger.info(f"Workbook saved successfully, URL: {file_url}")
 
     progress = "100%"
-    logger.info(f"Summary: Processed {processed_rows} rows, encountered {error_count} errors.")
+    logger.info(f"Summary: Processed {len(input_df)} rows, encountered {error_count} errors.")
     return progress, file_url
 
 
-def process_cross_dock_data_from_file(input_file_path: str, supplier_list: str, use_mv: bool = False) -> str:
+def process_cross_dock_data_from_file(
+    input_file_path: str,
+    supplier_list: str,
+    use_mv: bool = False,
+    progress_callback: ProgressCallback | None = None,
+) -> str:
     """
     Process cross-dock data from an Excel file and generate a new Excel file.
 
@@ -168,6 +216,7 @@ def process_cross_dock_data_from_file(input_file_path: str, supplier_list: str,
         input_file_path: Path to the input Excel file
         supplier_list: Supplier list to query (e.g., 'Группа для проценки ТРЕШКА', 'ОПТ-2')
         use_mv: Whether to use the MV-based query (default: False)
+        progress_callback: Optional callable receiving (rows written, total rows), see process_cross_dock_data
 
     Returns:
         str: Path to the generated output file
@@ -221,6 +270,9 @@ def process_cross_dock_data_from_file(input_file_path: str, supplier_list: str,
                 logger.error(error_msg)
                 raise ValueError(error_msg)
 
+        # Only brand and article are used downstream; drop the rest before converting cell values
+        df = df[required_columns]
+
         # Clean up the data
         # Convert all values to strings and strip whitespace
         for col in df.columns:
@@ -236,12 +288,12 @@ def process_cross_dock_data_from_file(input_file_path: str, supplier_list: str,
 
     # Process the data
     logger.info(f"Starting to process data with supplier list: {supplier_list}")
-    _, file_url = process_cross_dock_data(data, supplier_list, use_mv=use_mv)
+    _, file_url = process_cross_dock_data(data, supplier_list, use_mv=use_mv, progress_callback=progress_callback)
     logger.info(f"Data processed successfully, file URL: {file_url}")
 
     # Extract filename from URL (handle both forward and backslashes)
     file_name = file_url.replace("\\", "/").split("/")[-1]
-    output_file_path = os.path.join(settings.MEDIA_ROOT, "exports", file_name)
+    output_file_path = os.path.join(get_exports_dir(), file_name)
     logger.info(f"Output file path: {output_file_path}")
 
     return output_file_path
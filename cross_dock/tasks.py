@@ -34,8 +34,15 @@ def process_file_task(self, file_path, supplier_list, task_id, use_mv=False):
         # Mark as running
         task.mark_as_running()
 
+        def report_progress(current, total):
+            # Only tasks running under a worker (or apply()) have a result entry to update
+            if self.request.id:
+                self.update_state(state="PROGRESS", meta={"current": current, "total": total})
+
         # Process the file
-        output_file_path = process_cross_dock_data_from_file(file_path, supplier_list, use_mv=use_mv)
+        output_file_path = process_cross_dock_data_from_file(
+            file_path, supplier_list, use_mv=use_mv, progress_callback=report_progress
+        )
         output_filename = os.path.basename(output_file_path)
         output_url = f"{settings.MEDIA_URL}exports/{output_filename}"
 
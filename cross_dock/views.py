@@ -1,4 +1,3 @@
-import contextlib
 import logging
 import os
 import uuid
@@ -40,7 +39,7 @@ def task_detail(request, task_id):
 
     This view shows task details and allows users to add comments.
     """
-    task = get_object_or_404(CrossDockTask, id=task_id)
+    task = get_object_or_404(CrossDockTask.objects.select_related("user", "user__profile"), id=task_id)
     comments = task.comments.all().select_related("user", "user__profile")
 
     # Handle new comment submission
@@ -54,6 +53,15 @@ def task_detail(request, task_id):
     return render(request, "cross_dock/task_detail.html", {"task": task, "comments": comments})
 
 
+def _cleanup_upload_file(file_path):
+    """Remove a temporary upload file, logging instead of raising if that fails."""
+    try:
+        os.remove(file_path)
+        logger.info(f"Removed temporary upload file: {file_path}")
+    except Exception as e:
+        logger.warning(f"Failed to remove temporary upload file {file_path}: {e}")
+
+
 def process_file(request):
     """
     Process the uploaded Excel file and selected supplier list.
@@ -109,9 +117,7 @@ def process_file(request):
                     logger.info(f"ClickHouse connection test successful: {test_result}")
             except Exception as db_error:
                 logger.error(f"ClickHouse connection error: {db_error}")
-                # Clean up the uploaded file
-                with contextlib.suppress(Exception):
-                    os.remove(file_path)
+                _cleanup_upload_file(file_path)
                 return redirect(reverse("cross_dock:task_list"))
 
             # Create task record with PENDING status
@@ -146,11 +152,7 @@ def process_file(request):
                 except Exception as task_error:
                     logger.exception(f"Error updating task status: {task_error}")
 
-            # Clean up the uploaded file
-            try:
-                os.remove(file_path)
-            except Exception:
-                pass
+            _cleanup_upload_file(file_path)
 
             return redirect(reverse("cross_dock:task_list"))
 
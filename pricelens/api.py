@@ -8,17 +8,25 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from .serializers import LogEventSerializer
-from .utils import log_investigation_event
+from .utils import log_investigation_event, log_investigation_events
 
 
 class LogEventAPIView(APIView):
-    """API view for logging an investigation event."""
+    """
+    API view for logging an investigation event.
+
+    Accepts a single event object or a list of events; a list is logged with one bulk insert.
+    """
 
     permission_classes = [IsAuthenticated]
 
     def post(self, request, *args, **kwargs):
-        serializer = LogEventSerializer(data=request.data)
+        many = isinstance(request.data, list)
+        serializer = LogEventSerializer(data=request.data, many=many)
         if serializer.is_valid():
-            log_investigation_event(**serializer.validated_data)
+            if many:
+                log_investigation_events(serializer.validated_data)
+            else:
+                log_investigation_event(**serializer.validated_data)
             return Response(status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -11,8 +11,8 @@ Usage:
 
 from django.core.management.base import BaseCommand
 
-from common.models import Supplier
 from common.utils.clickhouse import get_clickhouse_client
+from pricelens.utils import save_suppliers
 
 
 class Command(BaseCommand):
@@ -29,7 +29,7 @@ class Command(BaseCommand):
 
                 self.stdout.write("Fetching suppliers from ClickHouse sup_stat.sup_list...")
                 query = "SELECT dif_id, name FROM sup_stat.sup_list"
-                suppliers_from_ch = client.execute(query)
+                suppliers_from_ch = client.query(query).result_rows
 
         except Exception as e:
             self.stdout.write(self.style.ERROR(f"An error occurred with ClickHouse operation: {e}"))
@@ -41,17 +41,7 @@ class Command(BaseCommand):
 
         self.stdout.write(f"Found {len(suppliers_from_ch)} suppliers in ClickHouse.")
 
-        updated_count = 0
-        created_count = 0
-        for supid, name in suppliers_from_ch:
-            _, created = Supplier.objects.update_or_create(
-                supid=supid,
-                defaults={"name": name if name else f"Supplier {supid}"},
-            )
-            if created:
-                created_count += 1
-            else:
-                updated_count += 1
+        created_count, updated_count = save_suppliers(suppliers_from_ch)
 
         self.stdout.write(
             self.style.SUCCESS(f"Supplier backfill complete. Created: {created_count}, Updated: {updated_count}.")
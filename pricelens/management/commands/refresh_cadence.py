@@ -1,16 +1,8 @@
 from django.core.management.base import BaseCommand
 
 from common.models import Supplier
-from common.utils.clickhouse import get_clickhouse_client
-from pricelens.models import CadenceProfile
-
-# --- Tuning Parameters ---
-# Defines how much the standard deviation can be relative to the median gap.
-# A value of 1.0 means the std dev can be up to the size of the median gap.
-CONSISTENCY_MULTIPLIER: float = 1.0
-# The percentage of "bad gaps" allowed before a supplier is flagged as inconsistent.
-# A "bad gap" is a gap > median_gap * 2.
-BAD_GAP_PERCENTAGE_THRESHOLD: float = 20.0
+from common.utils.clickhouse import get_clickhouse_client, query_dataframe_chunks
+from pricelens.utils import CADENCE_QUERY_COLUMNS, classify_cadence_profiles, save_cadence_profiles
 
 
 class Command(BaseCommand):
@@ -68,12 +60,14 @@ class Command(BaseCommand):
                     arrayCount(x -> x > med_gap * 2, gaps)   AS bad_gaps
                 FROM by_sup
             )
-            SELECT *
+            SELECT supid, med_gap, sd_gap, days_since_last, last_success_date, total_gaps, bad_gaps
             FROM stats
             WHERE length(days) >= 1;   -- skip suppliers with <1 successes
         """
         params = {"supids": supplier_ids}
 
+        created_count = 0
+        updated_count = 0
         try:
             with get_clickhouse_client(readonly=0) as client:
                 if client is None:
@@ -81,64 +75,24 @@ class Command(BaseCommand):
                     return
 
                 self.stdout.write("Ensuring the `success_days_180` view exists in ClickHouse...")
-                client.execute(create_view_sql, params=params)
+                client.command(create_view_sql, parameters=params)
                 self.stdout.write(self.style.SUCCESS("View is ready."))
 
-                self.stdout.write("Executing cadence profile query...")
-                rows = client.query_dataframe(cadence_profile_sql)
-                self.stdout.write(f"Found {len(rows)} suppliers with sufficient data for cadence profiling.")
+                self.stdout.write("Streaming cadence profile query results...")
+                for rows in query_dataframe_chunks(client, cadence_profile_sql, CADENCE_QUERY_COLUMNS):
+                    self.stdout.write(f"Updating {len(rows)} profiles in PostgreSQL...")
+                    chunk_created, chunk_updated = save_cadence_profiles(classify_cadence_profiles(rows))
+                    created_count += chunk_created
+                    updated_count += chunk_updated
 
         except Exception as e:
-            self.stderr.write(self.style.ERROR(f"An error occurred while querying ClickHouse: {e}"))
+            self.stderr.write(self.style.ERROR(f"An error occurred during the cadence refresh: {e}"))
             return
 
-        if rows.empty:
+        if not created_count + updated_count:
             self.stdout.write(self.style.SUCCESS("No supplier profiles to update."))
             return
 
-        self.stdout.write(f"Updating {len(rows)} profiles in PostgreSQL...")
-
-        updated_count = 0
-        created_count = 0
-
-        for _, row in rows.iterrows():
-            days_since_last = row["days_since_last"]
-            med_gap = row["med_gap"]
-            sd_gap = row["sd_gap"]
-
-            profile_data = {
-                "days_since_last": days_since_last,
-                "last_success_date": row["last_success_date"],
-            }
-
-            if med_gap is not None and sd_gap is not None and med_gap > 0:
-                if days_since_last >= 28:
-                    bucket = "dead"
-                else:
-                    is_consistent_by_std_dev = sd_gap <= med_gap * CONSISTENCY_MULTIPLIER
-                    total_gaps = row["total_gaps"]
-                    bad_gaps = row["bad_gaps"]
-                    bad_gap_percentage = (bad_gaps / total_gaps) * 100 if total_gaps > 0 else 0
-                    is_consistent_by_outliers = bad_gap_percentage < BAD_GAP_PERCENTAGE_THRESHOLD
-                    bucket = "consistent" if is_consistent_by_std_dev or is_consistent_by_outliers else "inconsistent"
-
-                profile_data["median_gap_days"] = round(med_gap)
-                profile_data["sd_gap"] = float(sd_gap)
-                profile_data["bucket"] = bucket
-            else:
-                profile_data["median_gap_days"] = None
-                profile_data["sd_gap"] = None
-                profile_data["bucket"] = "new"
-
-            _, created = CadenceProfile.objects.update_or_create(
-                supplier_id=row["supid"],
-                defaults=profile_data,
-            )
-            if created:
-                created_count += 1
-            else:
-                updated_count += 1
-
         self.stdout.write(
             self.style.SUCCESS(f"Cadence profile refresh complete. Created: {created_count}, Updated: {updated_count}.")
         )
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.3 on 2026-10-15 23:16
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+# InvestigationStatus.OPEN, spelled out so the migration does not depend on the current models
+OPEN_STATUS = 0
+
+
+def merge_duplicate_investigations(apps, schema_editor):
+    """
+    Collapse investigations sharing (event_dt, supplier, fail_reason) into one row so the constraint can be added.
+
+    The row someone worked on is kept: closed before open, then one with an investigator, then one with a
+    note, then the earliest. Notes of the other rows are appended to it, and an investigator or file path
+    missing on the kept row is taken over from them. The other rows are then deleted; this is not reversible.
+    """
+    Investigation = apps.get_model("pricelens", "Investigation")
+    duplicate_keys = (
+        Investigation.objects.filter(fail_reason__isnull=False)
+        .values("event_dt", "supplier_id", "fail_reason_id")
+        .annotate(count=Count("id"))
+        .filter(count__gt=1)
+    )
+    for key in duplicate_keys:
+        duplicates = sorted(
+            Investigation.objects.filter(
+                event_dt=key["event_dt"], supplier_id=key["supplier_id"], fail_reason_id=key["fail_reason_id"]
+            ),
+            key=lambda investigation: (
+                investigation.status == OPEN_STATUS,
+                investigation.investigator_id is None,
+                not investigation.note,
+                investigation.created_at,
+            ),
+        )
+        kept, others = duplicates[0], duplicates[1:]
+
+        notes = [kept.note] if kept.note else []
+        notes += [other.note for other in others if other.note and other.note not in notes]
+        kept.note = "\n\n".join(notes)
+        for other in others:
+            if kept.investigator_id is None and other.investigator_id is not None:
+                kept.investigator_id = other.investigator_id
+                kept.investigated_at = kept.investigated_at or other.investigated_at
+            if not kept.file_path:
+                kept.file_path = other.file_path
+        kept.save(update_fields=["note", "investigator", "investigated_at", "file_path"])
+
+        Investigation.objects.filter(pk__in=[other.pk for other in others]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0002_supplier_is_enabled'),
+        ('pricelens', '0005_alter_cadenceprofile_bucket_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_investigations, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='investigation',
+            constraint=models.UniqueConstraint(fields=('event_dt', 'supplier', 'fail_reason'), name='unique_investigation_event'),
+        ),
+    ]
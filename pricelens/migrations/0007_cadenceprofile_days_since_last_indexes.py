@@ -0,0 +1,22 @@
+# Generated by Django 5.2.3 on 2026-10-15 23:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0002_supplier_is_enabled'),
+        ('pricelens', '0006_investigation_unique_event'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cadenceprofile',
+            index=models.Index(fields=['days_since_last'], name='pricelens_c_days_si_a070e9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cadenceprofile',
+            index=models.Index(fields=['bucket', 'days_since_last'], name='pricelens_c_bucket_3256be_idx'),
+        ),
+    ]
@@ -53,6 +53,9 @@ class Investigation(BaseModel):
             models.Index(fields=["status", "event_dt"]),
             models.Index(fields=["supplier", "event_dt"]),
         ]
+        constraints = [
+            models.UniqueConstraint(fields=["event_dt", "supplier", "fail_reason"], name="unique_investigation_event"),
+        ]
 
     @property
     def get_download_url(self) -> str:
@@ -83,3 +86,10 @@ class CadenceProfile(BaseModel):
     days_since_last = models.PositiveIntegerField()
     last_success_date = models.DateField()
     bucket = models.CharField(max_length=16, choices=BucketChoices.choices)
+
+    class Meta:
+        indexes = [
+            # The cadence list is ordered by days_since_last, with or without a bucket filter
+            models.Index(fields=["days_since_last"]),
+            models.Index(fields=["bucket", "days_since_last"]),
+        ]
@@ -3,12 +3,32 @@ Utility functions for the pricelens app.
 """
 
 import datetime
+from collections.abc import Iterable, Sequence
 
-from django.db import IntegrityError
+import numpy as np
+import pandas as pd
+from django.db import transaction
 
 from common.models import Supplier
 
-from .models import FailReason, Investigation, InvestigationStatus
+from .models import BucketChoices, CadenceProfile, FailReason, Investigation, InvestigationStatus
+
+# --- Cadence tuning parameters ---
+# Defines how much the standard deviation can be relative to the median gap.
+# A value of 1.0 means the std dev can be up to the size of the median gap.
+CONSISTENCY_MULTIPLIER: float = 1.0
+# The percentage of "bad gaps" allowed before a supplier is flagged as inconsistent.
+# A "bad gap" is a gap > median_gap * 2.
+BAD_GAP_PERCENTAGE_THRESHOLD: float = 20.0
+# Suppliers without a successful upload for this many days are considered dead.
+DEAD_AFTER_DAYS: int = 28
+
+# Columns of the ClickHouse error rows consumed by build_missing_investigations
+INVESTIGATION_ERROR_COLUMNS = ["event_dt", "supid", "error_text"]
+# Columns of the ClickHouse cadence query rows consumed by classify_cadence_profiles
+CADENCE_QUERY_COLUMNS = ["supid", "med_gap", "sd_gap", "days_since_last", "last_success_date", "total_gaps", "bad_gaps"]
+
+CADENCE_PROFILE_FIELDS = ["median_gap_days", "sd_gap", "days_since_last", "last_success_date", "bucket"]
 
 
 def log_investigation_event(
@@ -20,28 +40,242 @@ def log_investigation_event(
 
     This function will not create a new Supplier if one is not found. It will
     only log events for suppliers that already exist in the database.
+
+    Duplicates are rejected by the unique (event_dt, supplier, fail_reason) constraint: the row is
+    inserted with ON CONFLICT DO NOTHING, so concurrent calls with the same event cannot race.
     """
-    try:
-        supplier = Supplier.objects.get(supid=supid)
-    except Supplier.DoesNotExist:
+    if not Supplier.objects.filter(supid=supid).exists():
         return
 
     fail_reason, _ = FailReason.objects.get_or_create(code=reason, defaults={"name": reason, "description": ""})
 
-    try:
-        # Use get_or_create for atomicity and to prevent race conditions
-        Investigation.objects.get_or_create(
-            supplier=supplier,
+    Investigation.objects.bulk_create(
+        [
+            Investigation(
+                supplier_id=supid,
+                event_dt=event_dt,
+                fail_reason=fail_reason,
+                stage=stage,
+                file_path=file_path,
+                status=InvestigationStatus.OPEN,
+            )
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def get_fail_reason_ids(codes: Iterable[str]) -> dict[str, int]:
+    """
+    Map FailReason codes to their ids, creating the missing reasons.
+
+    Existing reasons are read with one query and the missing ones are inserted with one bulk insert,
+    instead of a get_or_create round trip per code.
+    """
+    codes = set(codes)
+    reason_ids = dict(FailReason.objects.filter(code__in=codes).values_list("code", "id"))
+    missing_codes = codes - reason_ids.keys()
+    if missing_codes:
+        FailReason.objects.bulk_create(
+            [FailReason(code=code, name=code, description="") for code in missing_codes], ignore_conflicts=True
+        )
+        reason_ids.update(FailReason.objects.filter(code__in=missing_codes).values_list("code", "id"))
+    return reason_ids
+
+
+def log_investigation_events(events: Iterable[dict]) -> int:
+    """
+    Log a batch of investigation events with a fixed number of queries.
+
+    Each event is a dict of log_investigation_event arguments. As there, events of unknown suppliers
+    are skipped and duplicates are dropped by the unique constraint, but suppliers and fail reasons
+    are resolved for the whole batch and all rows go out in one bulk insert.
+
+    Returns:
+        int: Number of events sent to the database (events of unknown suppliers excluded)
+    """
+    events = list(events)
+    known_supids = set(
+        Supplier.objects.filter(supid__in={event["supid"] for event in events}).values_list("supid", flat=True)
+    )
+    events = [event for event in events if event["supid"] in known_supids]
+    if not events:
+        return 0
+
+    reason_ids = get_fail_reason_ids(event["reason"] for event in events)
+    Investigation.objects.bulk_create(
+        [
+            Investigation(
+                supplier_id=event["supid"],
+                event_dt=event["event_dt"],
+                fail_reason_id=reason_ids[event["reason"]],
+                stage=event["stage"],
+                file_path=event["file_path"],
+                status=InvestigationStatus.OPEN,
+            )
+            for event in events
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    return len(events)
+
+
+def build_missing_investigations(rows: pd.DataFrame) -> list[Investigation]:
+    """
+    Build unsaved Investigation objects for ClickHouse error rows that are not in the database yet.
+
+    Args:
+        rows: DataFrame with `event_dt` (timezone-aware), `supid` and `error_text` columns
+
+    Returns:
+        list: New Investigation instances, one per distinct (event_dt, supplier, fail reason) key
+    """
+    key_columns = ["event_dt", "supid", "fail_reason_id"]
+    reason_ids = get_fail_reason_ids(rows["error_text"].unique())
+    keys = pd.DataFrame(
+        {
+            "event_dt": rows["event_dt"].dt.tz_convert("UTC").astype("datetime64[ns, UTC]"),
+            "supid": rows["supid"].astype("int64"),
+            "fail_reason_id": rows["error_text"].map(reason_ids).astype("int64"),
+        }
+    ).drop_duplicates()
+
+    # Only investigations of these suppliers within the batch's time range can collide
+    existing = pd.DataFrame.from_records(
+        list(
+            Investigation.objects.filter(
+                supplier_id__in=keys["supid"].unique().tolist(),
+                event_dt__range=(keys["event_dt"].min(), keys["event_dt"].max()),
+            ).values_list("event_dt", "supplier_id", "fail_reason_id")
+        ),
+        columns=key_columns,
+    )
+    if not existing.empty:
+        existing = existing.dropna().astype({"event_dt": "datetime64[ns, UTC]", "fail_reason_id": "int64"})
+        is_existing = pd.MultiIndex.from_frame(keys).isin(pd.MultiIndex.from_frame(existing))
+        keys = keys[~is_existing]
+
+    return [
+        Investigation(
             event_dt=event_dt,
-            fail_reason=fail_reason,
-            defaults={
-                "stage": stage,
-                "file_path": file_path,
-                "status": InvestigationStatus.OPEN,
-            },
+            supplier_id=supid,
+            fail_reason_id=fail_reason_id,
+            stage="consolidate",
+            file_path="",
         )
-    except IntegrityError:
-        # This can happen in a race condition if two processes try to create the exact
-        # same record simultaneously. The first one succeeds, the second one fails
-        # the unique constraint. We can safely ignore this error.
-        pass
+        for event_dt, supid, fail_reason_id in zip(
+            keys["event_dt"].tolist(), keys["supid"].tolist(), keys["fail_reason_id"].tolist(), strict=True
+        )
+    ]
+
+
+def insert_missing_investigations(rows: pd.DataFrame) -> int:
+    """
+    Insert the ClickHouse error rows that are not logged as investigations yet.
+
+    Args:
+        rows: DataFrame as accepted by build_missing_investigations
+
+    Returns:
+        int: Number of inserted investigations
+    """
+    new_investigations = build_missing_investigations(rows)
+    if new_investigations:
+        with transaction.atomic():
+            # Rows logged concurrently since the existence check are skipped by the unique constraint
+            Investigation.objects.bulk_create(new_investigations, batch_size=1000, ignore_conflicts=True)
+    return len(new_investigations)
+
+
+def classify_cadence_profiles(rows: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compute the cadence profile fields for every supplier row of the ClickHouse cadence query.
+
+    The bucket is derived with whole-column operations:
+    - new: no usable gap statistics yet (a single success, or a zero median gap)
+    - dead: no success for DEAD_AFTER_DAYS days or more
+    - consistent: gap deviation within CONSISTENCY_MULTIPLIER of the median gap,
+      or fewer than BAD_GAP_PERCENTAGE_THRESHOLD percent bad gaps
+    - inconsistent: everything else
+
+    Args:
+        rows: DataFrame with `supid`, `med_gap`, `sd_gap`, `days_since_last`, `last_success_date`,
+            `total_gaps` and `bad_gaps` columns
+
+    Returns:
+        pd.DataFrame: `supplier_id` followed by CADENCE_PROFILE_FIELDS; missing gap statistics are None
+    """
+    med_gap = pd.to_numeric(rows["med_gap"], errors="coerce")
+    sd_gap = pd.to_numeric(rows["sd_gap"], errors="coerce")
+    has_gaps = med_gap.notna() & sd_gap.notna() & (med_gap > 0)
+
+    total_gaps = rows["total_gaps"]
+    bad_gap_percentage = (rows["bad_gaps"] / total_gaps.where(total_gaps > 0) * 100).fillna(0)
+    is_consistent = (sd_gap <= med_gap * CONSISTENCY_MULTIPLIER) | (bad_gap_percentage < BAD_GAP_PERCENTAGE_THRESHOLD)
+
+    bucket = np.select(
+        [~has_gaps, rows["days_since_last"] >= DEAD_AFTER_DAYS, is_consistent],
+        [BucketChoices.NEW.value, BucketChoices.DEAD.value, BucketChoices.CONSISTENT.value],
+        default=BucketChoices.INCONSISTENT.value,
+    )
+
+    return pd.DataFrame(
+        {
+            "supplier_id": rows["supid"],
+            "median_gap_days": med_gap.round().astype("Int64").astype(object).where(has_gaps, None),
+            "sd_gap": sd_gap.astype(object).where(has_gaps, None),
+            "days_since_last": rows["days_since_last"],
+            "last_success_date": rows["last_success_date"],
+            "bucket": bucket,
+        }
+    )
+
+
+def save_cadence_profiles(profiles: pd.DataFrame) -> tuple[int, int]:
+    """
+    Insert or update cadence profiles in a single bulk upsert.
+
+    Args:
+        profiles: DataFrame as returned by classify_cadence_profiles
+
+    Returns:
+        tuple: (created count, updated count)
+    """
+    supplier_ids = profiles["supplier_id"].tolist()
+    existing_count = CadenceProfile.objects.filter(supplier_id__in=supplier_ids).count()
+
+    # Missing values (NaN/NA) become None so nullable fields are stored as NULL
+    profiles = profiles.astype(object).where(profiles.notna(), None)
+    columns = [profiles[field].tolist() for field in ["supplier_id", *CADENCE_PROFILE_FIELDS]]
+    CadenceProfile.objects.bulk_create(
+        [
+            CadenceProfile(supplier_id=supplier_id, **dict(zip(CADENCE_PROFILE_FIELDS, values, strict=True)))
+            for supplier_id, *values in zip(*columns, strict=True)
+        ],
+        update_conflicts=True,
+        unique_fields=["supplier"],
+        update_fields=[*CADENCE_PROFILE_FIELDS, "updated_at"],
+        batch_size=5000,
+    )
+    return len(supplier_ids) - existing_count, existing_count
+
+
+def save_suppliers(rows: Sequence[tuple[int, str | None]]) -> tuple[int, int]:
+    """
+    Insert or update suppliers from ClickHouse `(supid, name)` rows in a single bulk upsert.
+
+    Suppliers without a name are stored as "Supplier <supid>". If a supid repeats, its last row wins.
+
+    Returns:
+        tuple: (created count, updated count)
+    """
+    names = {supid: name if name else f"Supplier {supid}" for supid, name in rows}
+    existing_count = Supplier.objects.filter(supid__in=names.keys()).count()
+    Supplier.objects.bulk_create(
+        [Supplier(supid=supid, name=name) for supid, name in names.items()],
+        update_conflicts=True,
+        unique_fields=["supid"],
+        update_fields=["name", "updated_at"],
+        batch_size=5000,
+    )
+    return len(names) - existing_count, existing_count
@@ -9,6 +9,9 @@ from django.views import generic
 
 from .models import BucketChoices, CadenceProfile, Investigation, InvestigationStatus
 
+# Supid range search in the cadence view, e.g. ">=300" or "<5"
+SUPID_QUERY_RE = re.compile(r"(>=|<=|>|<)(\d+)")
+
 
 class DashboardView(generic.TemplateView):
     template_name = "pricelens/dashboard.html"
@@ -61,7 +64,9 @@ class DashboardView(generic.TemplateView):
                 },
                 "top_reasons": list(top_reasons),
                 "buckets": ordered_buckets,
-                "anomalies": CadenceProfile.objects.exclude(bucket=BucketChoices.DEAD).exclude(supplier__is_enabled=False)
+                "anomalies": CadenceProfile.objects.select_related("supplier")
+                .exclude(bucket=BucketChoices.DEAD)
+                .exclude(supplier__is_enabled=False)
                 .filter(days_since_last__gt=F("median_gap_days") * 2)
                 .order_by("-days_since_last")[:50],
             }
@@ -136,7 +141,7 @@ class CadenceView(generic.ListView):
         if query:
             q_objects = Q(supplier__name__icontains=query)
             # Check for advanced search operators
-            match = re.match(r"(>=|<=|>|<)(\d+)", query)
+            match = SUPID_QUERY_RE.match(query)
             if match:
                 operator = match.group(1)
                 value = int(match.group(2))
@@ -169,7 +174,7 @@ class CadenceView(generic.ListView):
 
 
 class InvestigationDetailView(generic.UpdateView):
-    model = Investigation
+    queryset = Investigation.objects.select_related("supplier", "fail_reason")
     fields = ["note"]  # note editable
     template_name = "pricelens/investigate.html"
     context_object_name = "investigation"
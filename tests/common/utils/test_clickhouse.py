@@ -0,0 +1,70 @@
+"""
+Tests for ClickHouse utilities.
+
+This module contains tests for the shared ClickHouse client context manager and query helpers.
+"""
+
+from unittest import mock
+
+from clickhouse_connect.driver.httpclient import HttpClient
+from urllib3 import PoolManager, ProxyManager
+
+from common.utils.clickhouse import get_clickhouse_client, query_dataframe_chunks
+
+
+class TestClickHouseClient:
+    """Test suite for get_clickhouse_client."""
+
+    @mock.patch("common.utils.clickhouse.clickhouse_connect.get_client")
+    def test_clients_share_connection_pool(self, mock_get_client):
+        """Test that consecutive clients reuse one connection pool and are always closed."""
+        mock_get_client.side_effect = lambda **kwargs: mock.MagicMock()
+
+        with get_clickhouse_client() as first_client:
+            pass
+        with get_clickhouse_client(readonly=0) as second_client:
+            pass
+
+        first_pool = mock_get_client.call_args_list[0].kwargs["pool_mgr"]
+        second_pool = mock_get_client.call_args_list[1].kwargs["pool_mgr"]
+        assert first_pool is second_pool
+        assert mock_get_client.call_args_list[1].kwargs["settings"] == {"readonly": 0}
+        first_client.close.assert_called_once()
+        second_client.close.assert_called_once()
+
+    @mock.patch("common.utils.clickhouse.clickhouse_connect.get_client")
+    def test_pool_honors_http_proxy_env(self, mock_get_client, monkeypatch, settings):
+        """Test that the shared pool goes through HTTP_PROXY unless NO_PROXY exempts the host."""
+        settings.CLICKHOUSE_HOST = "clickhouse.internal"
+        # The lowercase variables take precedence, so keep them out of the way
+        monkeypatch.delenv("http_proxy", raising=False)
+        monkeypatch.delenv("no_proxy", raising=False)
+        monkeypatch.setenv("HTTP_PROXY", "http://proxy.internal:3128")
+
+        monkeypatch.setenv("NO_PROXY", "other.internal")
+        with get_clickhouse_client():
+            pass
+        proxied_pool = mock_get_client.call_args.kwargs["pool_mgr"]
+
+        monkeypatch.setenv("NO_PROXY", "clickhouse.internal")
+        with get_clickhouse_client():
+            pass
+        direct_pool = mock_get_client.call_args.kwargs["pool_mgr"]
+
+        assert isinstance(proxied_pool, ProxyManager)
+        assert proxied_pool.proxy.host == "proxy.internal"
+        assert type(direct_pool) is PoolManager
+
+
+def test_query_dataframe_chunks_splits_streamed_rows():
+    """Test that streamed row blocks are regrouped into DataFrames of at most chunk_size rows."""
+    client = mock.MagicMock(spec=HttpClient)
+    stream = client.query_row_block_stream.return_value.__enter__.return_value
+    stream.__iter__.return_value = iter([[(1, "a")], [(2, "b"), (3, "c")]])
+
+    chunks = list(query_dataframe_chunks(client, "SELECT", ["id", "name"], params={"x": 1}, chunk_size=2))
+
+    assert [chunk["id"].tolist() for chunk in chunks] == [[1, 2], [3]]
+    assert chunks[0].columns.tolist() == ["id", "name"]
+    client.query_row_block_stream.assert_called_once_with("SELECT", parameters={"x": 1}, settings={"max_block_size": 2})
+    client.query_row_block_stream.return_value.__exit__.assert_called_once()
@@ -6,10 +6,11 @@ for creating and saving Excel workbooks.
 """
 
 import os
-import tempfile
-from unittest import mock
+import zipfile
 
-from common.utils.excel import create_workbook, save_workbook
+from openpyxl import load_workbook
+
+from common.utils.excel import create_workbook, get_exports_dir, save_workbook, save_workbook_to_buffer, write_rows
 
 
 class TestExcelUtilities:
@@ -21,24 +22,55 @@ class TestExcelUtilities:
         assert wb is not None
         assert hasattr(wb, "active")
 
-    def test_save_workbook(self):
+    def test_write_rows_write_only_workbook(self, settings, tmp_path):
+        """Test that rows written to a write-only workbook round-trip through save_workbook."""
+        settings.MEDIA_ROOT = str(tmp_path)
+        wb = create_workbook(write_only=True)
+        write_rows(wb, [["SKU", "Цена"], ["VAG|123", 10.5], [None, 3]])
+        save_workbook(wb, "write_only.xlsx")
+
+        reopened_wb = load_workbook(os.path.join(tmp_path, "exports", "write_only.xlsx"), read_only=True)
+        assert list(reopened_wb.active.iter_rows(values_only=True)) == [
+            ("SKU", "Цена"),
+            ("VAG|123", 10.5),
+            (None, 3),
+        ]
+        reopened_wb.close()
+
+    def test_save_workbook(self, settings, tmp_path):
         """Test that save_workbook correctly saves a workbook to a file."""
-        with (
-            tempfile.TemporaryDirectory() as temp_dir,
-            mock.patch("django.conf.settings.MEDIA_ROOT", temp_dir),
-            mock.patch("django.conf.settings.MEDIA_URL", "/media/"),
-        ):
-            wb = create_workbook()
-            filename = "test_workbook.xlsx"
-            url = save_workbook(wb, filename)
-            file_path = os.path.join(temp_dir, "exports", filename)
-            assert os.path.exists(file_path)
-            # Verify the file is a valid Excel file
-            assert os.path.getsize(file_path) > 0
-            # Verify workbook can be reopened
-            from openpyxl import load_workbook
-
-            reopened_wb = load_workbook(file_path)
-            assert reopened_wb is not None
-            expected_url = "/media/exports/test_workbook.xlsx"
-            assert url == expected_url
+        settings.MEDIA_ROOT = str(tmp_path)
+        settings.MEDIA_URL = "/media/"
+        wb = create_workbook()
+        filename = "test_workbook.xlsx"
+        url = save_workbook(wb, filename)
+        file_path = os.path.join(tmp_path, "exports", filename)
+        assert os.path.exists(file_path)
+        # Verify the file is a valid Excel file
+        assert os.path.getsize(file_path) > 0
+        # Verify workbook can be reopened
+        reopened_wb = load_workbook(file_path)
+        assert reopened_wb is not None
+        expected_url = "/media/exports/test_workbook.xlsx"
+        assert url == expected_url
+
+    def test_save_workbook_to_buffer(self):
+        """Test that save_workbook_to_buffer returns a loadable in-memory workbook."""
+        wb = create_workbook()
+        wb.active.append(["SKU", "Бренд"])
+        buffer = save_workbook_to_buffer(wb)
+        assert buffer.tell() == 0
+        # .xlsx files are deflated ZIP archives
+        with zipfile.ZipFile(buffer) as archive:
+            assert {info.compress_type for info in archive.infolist()} == {zipfile.ZIP_DEFLATED}
+        buffer.seek(0)
+
+        reopened_wb = load_workbook(buffer)
+        assert [cell.value for cell in reopened_wb.active[1]] == ["SKU", "Бренд"]
+
+    def test_get_exports_dir_follows_media_root(self, settings, tmp_path):
+        """Test that the cached exports directory is resolved per MEDIA_ROOT value."""
+        for media_root in (tmp_path / "first", tmp_path / "second"):
+            settings.MEDIA_ROOT = str(media_root)
+            assert get_exports_dir() == os.path.join(media_root, "exports")
+            assert os.path.isdir(get_exports_dir())
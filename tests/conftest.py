@@ -1,5 +1,6 @@
 import pytest
 from django.contrib.auth import get_user_model
+from django.test import Client, RequestFactory, override_settings
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 
@@ -36,48 +37,77 @@ def pytest_configure(config):
         config.option.verbose = True
 
 
-@pytest.fixture(autouse=True)
-def _override_celery_settings_for_tests(settings):
+@pytest.fixture(scope="session", autouse=True)
+def _override_celery_settings_for_tests():
     """Force Celery to run synchronously in tests and use a local backend."""
-    settings.CELERY_TASK_ALWAYS_EAGER = True
-    settings.CELERY_BROKER_URL = "memory://"
-    settings.CELERY_RESULT_BACKEND = "django-db"
+    with override_settings(
+        CELERY_TASK_ALWAYS_EAGER=True,
+        CELERY_BROKER_URL="memory://",
+        CELERY_RESULT_BACKEND="django-db",
+    ):
+        yield
 
 
-@pytest.fixture(autouse=True)
-# using aaa in name to make sure this fixture always runs first due to some alphabetical order in certain cases
-def aaa_db(db):
-    pass
+@pytest.fixture(scope="session")
+def request_factory():
+    """Provides a Django RequestFactory instance shared by all view tests."""
+    return RequestFactory()
 
 
 User = get_user_model()
 
 
+@pytest.fixture(scope="session")
+def session_user(django_db_setup, django_db_blocker):
+    """Creates the shared test user once per session (per xdist worker)."""
+    with django_db_blocker.unblock():
+        return UserFactory()
+
+
 @pytest.fixture
-def user(db):
-    """Provides a user instance."""
-    return UserFactory()
+def user(db, session_user):
+    """
+    Provides a user instance.
+
+    The row is created once per session; each test gets a fresh instance so attribute changes made
+    by one test don't leak into the next. Database changes are rolled back with the test transaction.
+    """
+    return User.objects.get(pk=session_user.pk)
+
+
+@pytest.fixture(scope="session")
+def session_login_cookies(session_user, django_db_blocker):
+    """Logs the shared test user in once per session and returns the resulting session cookies."""
+    with django_db_blocker.unblock():
+        login_client = Client()
+        login_client.force_login(session_user)
+    return login_client.cookies
 
 
 @pytest.fixture
-def authenticated_user(client, user):
+def authenticated_user(client, user, session_login_cookies):
     """
-    Provides an authenticated user by force-logging them in.
+    Provides an authenticated user by reusing the session-wide login.
 
-    This fixture uses `client.force_login()` for efficiency, as it directly
-    logs in a user without going through the session and password validation
-    process. This is suitable for most tests that simply require an
-    authenticated user context.
+    The session row is created once by `session_login_cookies` (via `client.force_login()`, which
+    skips password validation); each test only copies its cookie into the test client. Session
+    changes made during a test are rolled back with the test transaction.
     """
-    client.force_login(user)
+    client.cookies.update(session_login_cookies)
     return user
 
 
+@pytest.fixture(scope="session")
+def session_api_token(django_db_setup, django_db_blocker):
+    """Creates the API user and its token once per session (per xdist worker)."""
+    with django_db_blocker.unblock():
+        return Token.objects.create(user=UserFactory())
+
+
 @pytest.fixture
-def api_client(db):
+def api_client(db, session_api_token):
     """Provides an authenticated API client."""
-    user = UserFactory()
-    token = Token.objects.create(user=user)
+    token = session_api_token
     client = APIClient()
     client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
     return client
@@ -6,14 +6,21 @@ import pytest
 from core.reporting import ProgressReporter, ReportStatus
 
 
-@pytest.fixture
-def mock_task():
-    """Provides a mock task object with an update_state method."""
+@pytest.fixture(scope="module")
+def _mock_task_template():
+    """Builds the mock task object once per module."""
     task = Mock()
     task.update_state = Mock()
     return task
 
 
+@pytest.fixture
+def mock_task(_mock_task_template):
+    """Provides a mock task object with an update_state method and a clean call history."""
+    _mock_task_template.reset_mock(return_value=True, side_effect=True)
+    return _mock_task_template
+
+
 def test_report_step_basic_payload(mock_task):
     """Verify the basic payload shape for a step report."""
     reporter = ProgressReporter(task=mock_task)
@@ -24,3 +24,17 @@ def sample_supplier_data():
 def sample_input_data():
     """Fixture providing sample input data."""
     return [{"Бренд": "HYUNDAI/KIA/MOBIS", "Артикул": "223112e100"}, {"Бренд": "VAG", "Артикул": "000915105cd"}]
+
+
+@pytest.fixture(scope="module")
+def exports_root(tmp_path_factory):
+    """Fixture providing a MEDIA_ROOT directory shared by the tests of a module."""
+    return tmp_path_factory.mktemp("media")
+
+
+@pytest.fixture
+def media_settings(settings, exports_root):
+    """Fixture pointing MEDIA_ROOT/MEDIA_URL at the module's temporary media directory."""
+    settings.MEDIA_ROOT = str(exports_root)
+    settings.MEDIA_URL = "/media/"
+    return settings
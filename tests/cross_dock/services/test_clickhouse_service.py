@@ -9,7 +9,13 @@ from unittest import mock
 
 import pandas as pd
 
-from cross_dock.services.clickhouse_service import query_supplier_data
+from cross_dock.services.clickhouse_service import (
+    PAIRS_PER_QUERY,
+    brand_sku_key,
+    brand_sku_keys,
+    query_supplier_data,
+    query_supplier_data_batch,
+)
 
 
 class TestClickHouseService:
@@ -21,20 +27,26 @@ class TestClickHouseService:
         mock_client = mock.MagicMock()
         mock_get_client.return_value.__enter__.return_value = mock_client
 
-        # Setup mock to return suppliers list and then price data
-        mock_client.execute.side_effect = [
-            [(1001,), (1002,), (1003,)],  # Suppliers query result
-            [(100.50, 5, "Supplier A"), (120.75, 10, "Supplier B"), (90.25, 3, "Supplier C")],  # Price query result
+        # Supplier list lookup and prices are fetched in a single round trip
+        mock_client.execute.return_value = [
+            (100.50, 5, "Supplier A", "hyundai/kia", "223112e100"),
+            (120.75, 10, "Supplier B", "hyundai/kia", "223112e100"),
+            (90.25, 3, "Supplier C", "hyundai/kia", "223112e100"),
         ]
 
         result = query_supplier_data("HYUNDAI/KIA/MOBIS", "223112e100", "emex")
 
+        mock_client.execute.assert_called_once()
+
         assert isinstance(result, pd.DataFrame)
         assert list(result.columns) == ["price", "quantity", "supplier_name"]
         assert len(result) == 3
         assert result.iloc[0]["price"] == 100.50
         assert result.iloc[0]["quantity"] == 5
         assert result.iloc[0]["supplier_name"] == "Supplier A"
+        assert result["price"].dtype == "float64"
+        assert result["quantity"].dtype == "Int64"
+        assert result["supplier_name"].dtype == "category"
 
     @mock.patch("cross_dock.services.clickhouse_service.get_clickhouse_client")
     def test_query_supplier_data_no_suppliers(self, mock_get_client):
@@ -63,3 +75,70 @@ class TestClickHouseService:
         assert isinstance(result, pd.DataFrame)
         assert result.empty
         assert list(result.columns) == ["price", "quantity", "supplier_name"]
+
+    @mock.patch("cross_dock.services.clickhouse_service.get_clickhouse_client")
+    def test_query_supplier_data_batch(self, mock_get_client):
+        """Test that a batch of pairs is queried in one round trip with normalized keys."""
+        mock_client = mock.MagicMock()
+        mock_get_client.return_value.__enter__.return_value = mock_client
+        mock_client.execute.return_value = [
+            (100.50, 5, "Supplier A", "hyundai/kia", "223112e100"),
+            (50.00, 2, "Supplier B", "vag", "000915105cd"),
+        ]
+
+        result = query_supplier_data_batch(
+            [("HYUNDAI/KIA/MOBIS", "223112E100"), ("Hyundai/Kia", "223112e100"), ("VAG", "000915105cd")], "emex"
+        )
+
+        mock_client.execute.assert_called_once()
+        query_params = mock_client.execute.call_args.args[1]
+        assert query_params["brand_sku_pairs"] == [("hyundai/kia", "223112e100"), ("vag", "000915105cd")]
+        assert list(result.columns) == ["price", "quantity", "supplier_name", "brand_lower", "sku_lower"]
+        assert len(result) == 2
+
+    @mock.patch("cross_dock.services.clickhouse_service.get_clickhouse_client")
+    def test_query_supplier_data_batch_splits_large_input(self, mock_get_client):
+        """Test that a large input is queried in bounded batches whose rows are combined."""
+        mock_client = mock.MagicMock()
+        mock_get_client.return_value.__enter__.return_value = mock_client
+        mock_client.execute.side_effect = lambda query, params: [(10.0, 1, "Supplier A", *params["brand_sku_pairs"][0])]
+        pairs = [("BRAND", f"SKU{i:05d}") for i in range(2 * PAIRS_PER_QUERY + 1)]
+
+        result = query_supplier_data_batch(pairs, "emex")
+
+        assert mock_client.execute.call_count == 3
+        batch_sizes = [len(call.args[1]["brand_sku_pairs"]) for call in mock_client.execute.call_args_list]
+        assert batch_sizes == [PAIRS_PER_QUERY, PAIRS_PER_QUERY, 1]
+        assert result["sku_lower"].tolist() == [
+            "sku00000",
+            f"sku{PAIRS_PER_QUERY:05d}",
+            f"sku{2 * PAIRS_PER_QUERY:05d}",
+        ]
+
+    @mock.patch("cross_dock.services.clickhouse_service.get_clickhouse_client")
+    def test_query_supplier_data_batch_failed_batch_empties_result(self, mock_get_client):
+        """Test that a failure in any batch returns an empty result instead of a partial one."""
+        mock_client = mock.MagicMock()
+        mock_get_client.return_value.__enter__.return_value = mock_client
+        mock_client.execute.side_effect = [[(10.0, 1, "Supplier A", "brand", "sku00000")], Exception("Test exception")]
+        pairs = [("BRAND", f"SKU{i:05d}") for i in range(PAIRS_PER_QUERY + 1)]
+
+        result = query_supplier_data_batch(pairs, "emex")
+
+        assert result.empty
+        assert list(result.columns) == ["price", "quantity", "supplier_name", "brand_lower", "sku_lower"]
+
+    def test_brand_sku_key_normalizes_hyundai_kia_aliases(self):
+        """Test that Hyundai/Kia aliases share a single lookup key."""
+        assert brand_sku_key(" HYUNDAI/KIA/MOBIS ", "223112E100") == ("hyundai/kia", "223112e100")
+        assert brand_sku_key("VAG", "000915105CD") == ("vag", "000915105cd")
+
+    def test_brand_sku_keys_matches_scalar_key(self):
+        """Test that the vectorized key builder normalizes exactly like brand_sku_key."""
+        brands = pd.Series(["HYUNDAI/KIA/MOBIS", " vag ", "Hyundai/Kia"])
+        skus = pd.Series(["223112E100", "000915105cd ", 12345])
+
+        brand_lower, sku_lower = brand_sku_keys(brands, skus)
+
+        expected = [brand_sku_key(brand, sku) for brand, sku in zip(brands, skus, strict=True)]
+        assert list(zip(brand_lower, sku_lower, strict=True)) == expected
@@ -6,114 +6,207 @@ for processing cross-dock data and generating Excel files.
 """
 
 import os
-import tempfile
+import re
 from unittest import mock
 
 import pandas as pd
+import pytest
 from openpyxl import load_workbook
 
 from cross_dock.services.excel_service import process_cross_dock_data
+from tests.factories import InputDataFactory
+
+EXPECTED_HEADERS = [
+    "SKU",
+    "Бренд",
+    "Артикул",
+    "Лучшая цена 1",
+    "Количество 1",
+    "Название поставщика 1",
+    "Лучшая цена 2",
+    "Количество 2",
+    "Название поставщика 2",
+    "Лучшая цена 3",
+    "Количество 3",
+    "Название поставщика 3",
+]
 
 
 class TestExcelService:
     """Test suite for Excel service functions."""
 
-    @mock.patch("cross_dock.services.clickhouse_service.query_supplier_data")
-    def test_process_cross_dock_data(self, mock_query_supplier_data):
+    @mock.patch("cross_dock.services.clickhouse_service.query_supplier_data_batch")
+    def test_process_cross_dock_data(self, mock_query_supplier_data, media_settings, sample_input_data):
         """Test processing cross-dock data and generating an Excel file."""
         mock_query_supplier_data.return_value = pd.DataFrame(
             {
                 "price": [100.50, 120.75, 90.25],
                 "quantity": [5, 10, 3],
                 "supplier_name": ["Supplier A", "Supplier B", "Supplier C"],
+                "brand_lower": ["hyundai/kia"] * 3,
+                "sku_lower": ["223112e100"] * 3,
             }
         )
 
+        progress, file_url = process_cross_dock_data(sample_input_data, "Группа для проценки ТРЕШКА")
+        assert progress == "100%"
+
+        file_path = os.path.join(media_settings.MEDIA_ROOT, "exports", os.path.basename(file_url))
+        assert os.path.exists(file_path)
+        assert re.fullmatch(r"cross_dock_\d{20}_[0-9a-f]{8}\.xlsx", os.path.basename(file_url))
+
+        wb = load_workbook(file_path)
+        sheet = wb.active
+
+        first_row = next(sheet.iter_rows(min_row=1, max_row=1, values_only=True))
+        assert list(first_row) == EXPECTED_HEADERS
+
+        assert sheet.cell(row=2, column=1).value == "HYUNDAI/KIA/MOBIS|223112e100"
+        assert sheet.cell(row=2, column=2).value == "HYUNDAI/KIA/MOBIS"
+        assert sheet.cell(row=2, column=3).value == "223112e100"
+        assert sheet.cell(row=2, column=4).value == 100.50
+        assert sheet.cell(row=2, column=5).value == 5
+        assert sheet.cell(row=2, column=6).value == "Supplier A"
+
+    @mock.patch("cross_dock.services.clickhouse_service.query_supplier_data_batch")
+    def test_process_cross_dock_data_pivots_best_offers_per_item(self, mock_query_supplier_data, media_settings):
+        """Test that offers are grouped per (brand, sku) in query order and limited to three."""
+        mock_query_supplier_data.return_value = pd.DataFrame(
+            {
+                "price": [10.0, 20.0, 5.0, 30.0, 40.0],
+                "quantity": [1, None, 7, 3, 4],
+                "supplier_name": ["Supplier A", "Supplier B", "Supplier E", "Supplier C", "Supplier D"],
+                "brand_lower": ["vag", "vag", "bosch", "vag", "vag"],
+                "sku_lower": ["000915105cd", "000915105cd", "0986452041", "000915105cd", "000915105cd"],
+            }
+        ).astype({"supplier_name": "category"})
+
         test_data = [
-            {"Бренд": "HYUNDAI/KIA/MOBIS", "Артикул": "223112e100"},
-            {"Бренд": "VAG", "Артикул": "000915105cd"},
+            {"Бренд": "BOSCH", "Артикул": "0986452041"},
+            {"Бренд": "VAG", "Артикул": "000915105CD"},
+        ]
+
+        _, file_url = process_cross_dock_data(test_data, "Группа для проценки ТРЕШКА")
+
+        wb = load_workbook(os.path.join(media_settings.MEDIA_ROOT, "exports", os.path.basename(file_url)))
+        sheet = wb.active
+
+        assert [cell.value for cell in sheet[2]][3:] == [5.0, 7, "Supplier E"] + [None] * 6
+        assert [cell.value for cell in sheet[3]][3:] == [
+            10.0,
+            1,
+            "Supplier A",
+            20.0,
+            None,
+            "Supplier B",
+            30.0,
+            3,
+            "Supplier C",
+        ]
+
+    @pytest.mark.parametrize("size", [1000, pytest.param(10000, marks=pytest.mark.slow)])
+    @mock.patch("cross_dock.services.clickhouse_service.query_supplier_data_batch")
+    def test_process_cross_dock_data_large_input(self, mock_query_supplier_data, media_settings, size):
+        """Test that every input row is written once and all pairs go to a single batch query."""
+        input_data = InputDataFactory.build_batch_np(size)
+        mock_query_supplier_data.return_value = pd.DataFrame(
+            columns=["price", "quantity", "supplier_name", "brand_lower", "sku_lower"]
+        )
+
+        _, file_url = process_cross_dock_data(input_data, "Группа для проценки ТРЕШКА")
+
+        mock_query_supplier_data.assert_called_once()
+        wb = load_workbook(
+            os.path.join(media_settings.MEDIA_ROOT, "exports", os.path.basename(file_url)), read_only=True
+        )
+        rows = list(wb.active.iter_rows(max_col=3, values_only=True))
+        assert len(rows) == size + 1
+        assert rows[-1] == (
+            f"{input_data[-1]['Бренд']}|{input_data[-1]['Артикул']}",
+            input_data[-1]["Бренд"],
+            input_data[-1]["Артикул"],
+        )
+        wb.close()
+
+    @mock.patch("cross_dock.services.clickhouse_service.query_supplier_data_batch")
+    def test_process_cross_dock_data_reports_progress(self, mock_query_supplier_data, media_settings):
+        """Test that progress is reported every 1000 written rows and once more for the remainder."""
+        input_data = InputDataFactory.build_batch_np(2500)
+        mock_query_supplier_data.return_value = pd.DataFrame(
+            columns=["price", "quantity", "supplier_name", "brand_lower", "sku_lower"]
+        )
+        progress_callback = mock.Mock()
+
+        process_cross_dock_data(input_data, "Группа для проценки ТРЕШКА", progress_callback=progress_callback)
+
+        assert progress_callback.call_args_list == [
+            mock.call(1000, 2500),
+            mock.call(2000, 2500),
+            mock.call(2500, 2500),
         ]
 
-        with tempfile.TemporaryDirectory() as temp_dir:
-            with mock.patch("django.conf.settings.MEDIA_ROOT", temp_dir):
-                with mock.patch("django.conf.settings.MEDIA_URL", "/media/"):
-                    progress, file_url = process_cross_dock_data(test_data, "Группа для проценки ТРЕШКА")
-                    assert progress == "100%"
-
-                    file_path = os.path.join(temp_dir, "exports", os.path.basename(file_url))
-                    assert os.path.exists(file_path)
-
-                    wb = load_workbook(file_path)
-                    sheet = wb.active
-
-                    headers = [
-                        "SKU",
-                        "Бренд",
-                        "Артикул",
-                        "Лучшая цена 1",
-                        "Количество 1",
-                        "Название поставщика 1",
-                        "Лучшая цена 2",
-                        "Количество 2",
-                        "Название поставщика 2",
-                        "Лучшая цена 3",
-                        "Количество 3",
-                        "Название поставщика 3",
-                    ]
-                    for col_num, header in enumerate(headers, start=1):
-                        assert sheet.cell(row=1, column=col_num).value == header
-
-                    assert sheet.cell(row=2, column=1).value == "HYUNDAI/KIA/MOBIS|223112e100"
-                    assert sheet.cell(row=2, column=2).value == "HYUNDAI/KIA/MOBIS"
-                    assert sheet.cell(row=2, column=3).value == "223112e100"
-                    assert sheet.cell(row=2, column=4).value == 100.50
-                    assert sheet.cell(row=2, column=5).value == 5
-                    assert sheet.cell(row=2, column=6).value == "Supplier A"
-
-    @mock.patch("cross_dock.services.clickhouse_service.query_supplier_data")
-    def test_process_cross_dock_data_empty_results(self, mock_query_supplier_data):
+    @mock.patch("cross_dock.services.clickhouse_service.query_supplier_data_batch")
+    def test_process_cross_dock_data_keeps_blank_row_for_malformed_item(self, mock_query_supplier_data, media_settings):
+        """Test that an item without brand/article becomes a blank row and later rows stay aligned."""
+        mock_query_supplier_data.return_value = pd.DataFrame(
+            {
+                "price": [50.0],
+                "quantity": [2],
+                "supplier_name": ["Supplier A"],
+                "brand_lower": ["vag"],
+                "sku_lower": ["000915105cd"],
+            }
+        )
+
+        test_data = [{"Brand": "VAG"}, {"Бренд": "VAG", "Артикул": "000915105cd"}]
+
+        _, file_url = process_cross_dock_data(test_data, "Группа для проценки ТРЕШКА")
+
+        wb = load_workbook(os.path.join(media_settings.MEDIA_ROOT, "exports", os.path.basename(file_url)))
+        sheet = wb.active
+        assert [cell.value for cell in sheet[2]] == [None] * len(EXPECTED_HEADERS)
+        assert [cell.value for cell in sheet[3]][:6] == ["VAG|000915105cd", "VAG", "000915105cd", 50.0, 2, "Supplier A"]
+
+    @mock.patch("cross_dock.services.clickhouse_service.query_supplier_data_batch")
+    def test_process_cross_dock_data_empty_results(self, mock_query_supplier_data, media_settings):
         """Test handling of empty query results."""
-        mock_query_supplier_data.return_value = pd.DataFrame(columns=["price", "quantity", "supplier_name"])
+        mock_query_supplier_data.return_value = pd.DataFrame(
+            columns=["price", "quantity", "supplier_name", "brand_lower", "sku_lower"]
+        )
 
         test_data = [{"Бренд": "BRAND", "Артикул": "ARTICLE"}]
 
-        with tempfile.TemporaryDirectory() as temp_dir:
-            with mock.patch("django.conf.settings.MEDIA_ROOT", temp_dir):
-                with mock.patch("django.conf.settings.MEDIA_URL", "/media/"):
-                    progress, file_url = process_cross_dock_data(test_data, "Группа для проценки ТРЕШКА")
-                    assert progress == "100%"
+        progress, file_url = process_cross_dock_data(test_data, "Группа для проценки ТРЕШКА")
+        assert progress == "100%"
 
-                    file_path = os.path.join(temp_dir, "exports", os.path.basename(file_url))
-                    assert os.path.exists(file_path)
+        file_path = os.path.join(media_settings.MEDIA_ROOT, "exports", os.path.basename(file_url))
+        assert os.path.exists(file_path)
 
-                    wb = load_workbook(file_path)
-                    sheet = wb.active
+        wb = load_workbook(file_path)
+        sheet = wb.active
 
-                    # Verify empty cells are handled properly
-                    assert sheet.cell(row=2, column=4).value is None
-                    assert sheet.cell(row=2, column=5).value is None
-                    assert sheet.cell(row=2, column=6).value is None
+        # Verify empty cells are handled properly
+        assert sheet.cell(row=2, column=4).value is None
+        assert sheet.cell(row=2, column=5).value is None
+        assert sheet.cell(row=2, column=6).value is None
 
-    @mock.patch("cross_dock.services.clickhouse_service.query_supplier_data")
-    def test_process_cross_dock_data_exception(self, mock_query_supplier_data):
+    @mock.patch("cross_dock.services.clickhouse_service.query_supplier_data_batch")
+    def test_process_cross_dock_data_exception(self, mock_query_supplier_data, media_settings):
         """Test error handling during data processing."""
         mock_query_supplier_data.side_effect = Exception("Test exception")
 
         test_data = [{"Бренд": "BRAND", "Артикул": "ARTICLE"}]
 
-        with tempfile.TemporaryDirectory() as temp_dir:
-            with mock.patch("django.conf.settings.MEDIA_ROOT", temp_dir):
-                with mock.patch("django.conf.settings.MEDIA_URL", "/media/"):
-                    progress, file_url = process_cross_dock_data(test_data, "Группа для проценки ТРЕШКА")
-                    assert progress == "100%"
+        progress, file_url = process_cross_dock_data(test_data, "Группа для проценки ТРЕШКА")
+        assert progress == "100%"
 
-                    file_path = os.path.join(temp_dir, "exports", os.path.basename(file_url))
-                    assert os.path.exists(file_path)
+        file_path = os.path.join(media_settings.MEDIA_ROOT, "exports", os.path.basename(file_url))
+        assert os.path.exists(file_path)
 
-                    wb = load_workbook(file_path)
-                    sheet = wb.active
+        wb = load_workbook(file_path)
+        sheet = wb.active
 
-                    # Verify error handling by checking for empty cells
-                    assert sheet.cell(row=2, column=4).value is None
-                    assert sheet.cell(row=2, column=5).value is None
-                    assert sheet.cell(row=2, column=6).value is None
+        # Verify error handling by checking for empty cells
+        assert sheet.cell(row=2, column=4).value is None
+        assert sheet.cell(row=2, column=5).value is None
+        assert sheet.cell(row=2, column=6).value is None
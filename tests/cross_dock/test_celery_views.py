@@ -9,9 +9,11 @@ from unittest import mock
 import pytest
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from cross_dock.models import CrossDockTask
+from cross_dock.models import CrossDockTask, TaskComment
 
 User = get_user_model()
 
@@ -144,3 +146,29 @@ def test_task_detail_view_add_comment(client, authenticated_user):
     comment = task.comments.first()
     assert comment.text == "Test comment"
     assert comment.user == authenticated_user
+
+
+def test_task_detail_view_query_count_does_not_grow_with_comments(client, authenticated_user):
+    """Test that the task owner and comment authors are loaded without per-row queries."""
+    task = CrossDockTask.objects.create(
+        status="SUCCESS",
+        filename="test.xlsx",
+        supplier_group="ОПТ-2",
+        user=authenticated_user,
+        result_url="/media/exports/test_result.xlsx",
+    )
+    url = reverse("cross_dock:task_detail", kwargs={"task_id": task.id})
+    TaskComment.objects.create(task=task, user=authenticated_user, text="First comment")
+
+    with CaptureQueriesContext(connection) as single_comment_queries:
+        client.get(url)
+
+    for i in range(5):
+        commenter = User.objects.create(username=f"commenter{i}")
+        TaskComment.objects.create(task=task, user=commenter, text=f"Comment {i}")
+
+    with CaptureQueriesContext(connection) as many_comment_queries:
+        response = client.get(url)
+
+    assert response.status_code == 200
+    assert len(many_comment_queries) == len(single_comment_queries)
@@ -4,8 +4,8 @@ Tests for cross-dock Celery tasks.
 This module contains tests for the Celery tasks used in the cross-dock app.
 """
 
+import io
 import os
-import tempfile
 import uuid
 from unittest import mock
 
@@ -20,28 +20,25 @@ from cross_dock.tasks import process_file_task
 User = get_user_model()
 
 
-@pytest.fixture
-def sample_excel_file():
-    """Create a sample Excel file for testing."""
-    # Create a temporary file
-    fd, path = tempfile.mkstemp(suffix=".xlsx")
-    os.close(fd)
-
-    # Create a sample DataFrame
+@pytest.fixture(scope="session")
+def sample_excel_bytes():
+    """Build the sample Excel file content once per session."""
     df = pd.DataFrame({"Бренд": ["TOYOTA", "NISSAN", "HONDA"], "Артикул": ["12345", "67890", "ABCDE"]})
+    buffer = io.BytesIO()
+    df.to_excel(buffer, index=False)
+    return buffer.getvalue()
 
-    # Save to Excel
-    df.to_excel(path, index=False)
 
-    yield path
-
-    # Clean up
-    if os.path.exists(path):
-        os.remove(path)
+@pytest.fixture
+def sample_excel_file(sample_excel_bytes, tmp_path):
+    """Create a sample Excel file for testing."""
+    path = tmp_path / "sample.xlsx"
+    path.write_bytes(sample_excel_bytes)
+    return str(path)
 
 
 @pytest.fixture
-def task_record():
+def task_record(db):
     """Create a sample task record."""
     user = User.objects.create(username="testuser")
     task = CrossDockTask.objects.create(status="PENDING", filename="test.xlsx", user=user)
@@ -52,7 +49,7 @@ def task_record():
 
 def test_process_file_task_success(sample_excel_file, task_record):
     """Test successful file processing."""
-    with mock.patch("cross_dock.services.excel_service.process_cross_dock_data_from_file") as mock_process:
+    with mock.patch("cross_dock.tasks.process_cross_dock_data_from_file") as mock_process:
         # Setup mock
         output_path = os.path.join(settings.MEDIA_ROOT, "exports", f"result_{uuid.uuid4()}.xlsx")
         mock_process.return_value = output_path
@@ -68,6 +65,7 @@ def test_process_file_task_success(sample_excel_file, task_record):
         task_record.refresh_from_db()
         assert task_record.status == "SUCCESS"
         assert task_record.result_url is not None
+        assert callable(mock_process.call_args.kwargs["progress_callback"])
 
 
 def test_process_file_task_failure(sample_excel_file, task_record):
@@ -87,3 +85,19 @@ def test_process_file_task_failure(sample_excel_file, task_record):
         task_record.refresh_from_db()
         assert task_record.status == "FAILURE"
         assert "Test error" in task_record.error_message
+
+
+def test_process_file_task_reports_progress(sample_excel_file, task_record):
+    """Test that row progress from the service is published as a PROGRESS state."""
+
+    def process_with_progress(file_path, supplier_list, use_mv=False, progress_callback=None):
+        progress_callback(1000, 2500)
+        return os.path.join(settings.MEDIA_ROOT, "exports", "result.xlsx")
+
+    with (
+        mock.patch("cross_dock.tasks.process_cross_dock_data_from_file", side_effect=process_with_progress),
+        mock.patch.object(process_file_task, "update_state") as mock_update_state,
+    ):
+        process_file_task.apply(args=(sample_excel_file, "ОПТ-2", str(task_record.id)))
+
+    mock_update_state.assert_called_once_with(state="PROGRESS", meta={"current": 1000, "total": 2500})
@@ -8,27 +8,23 @@ and best practices for maintainability and clarity.
 
 import json
 import logging
+from types import SimpleNamespace
 from unittest import mock
 
 import pytest
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.http import HttpResponseRedirect
-from django.test import RequestFactory
 
-from cross_dock.views import index, process_file
+from cross_dock.views import _cleanup_upload_file, index, process_file
+from cross_dock.views import logger as views_logger
 
 logger = logging.getLogger(__name__)
 
-
-@pytest.fixture
-def request_factory():
-    """Fixture providing a Django RequestFactory instance."""
-    return RequestFactory()
+PROCESS_FILE_URL = "/cross-dock/process-file/"
 
 
-@pytest.fixture
-def excel_file():
-    """Fixture providing a valid Excel file for testing."""
+@pytest.fixture(scope="module")
+def _excel_upload():
     return SimpleUploadedFile(
         name="test_file.xlsx",
         content=b"test content",
@@ -36,12 +32,36 @@ def excel_file():
     )
 
 
-@pytest.fixture
-def text_file():
-    """Fixture providing a text file for testing invalid formats."""
+@pytest.fixture(scope="module")
+def _text_upload():
     return SimpleUploadedFile(name="test_file.txt", content=b"test content", content_type="text/plain")
 
 
+@pytest.fixture
+def excel_file(_excel_upload):
+    """Fixture providing a valid Excel file for testing, rewound for each test."""
+    _excel_upload.seek(0)
+    return _excel_upload
+
+
+@pytest.fixture
+def text_file(_text_upload):
+    """Fixture providing a text file for testing invalid formats, rewound for each test."""
+    _text_upload.seek(0)
+    return _text_upload
+
+
+@pytest.fixture
+def patched_view_io():
+    """Patch the filesystem and URL helpers process_file touches; yields the mocks by name."""
+    with (
+        mock.patch("cross_dock.views.os.makedirs") as makedirs,
+        mock.patch("cross_dock.views.open", mock.mock_open(), create=True) as mock_open,
+        mock.patch("cross_dock.views.reverse", return_value="/cross_dock/tasks/") as reverse,
+    ):
+        yield SimpleNamespace(makedirs=makedirs, open=mock_open, reverse=reverse)
+
+
 class TestIndexView:
     """Tests for the index view."""
 
@@ -75,56 +95,44 @@ class TestIndexView:
 class TestProcessFileValidation:
     """Tests for process_file view validation."""
 
-    def test_rejects_non_post_requests(self, request_factory):
-        """Test that process_file rejects non-POST requests with 405 status."""
-        request = request_factory.get("/cross-dock/process-file/")
-
-        response = process_file(request)
-
-        assert response.status_code == 405
-        payload = json.loads(response.content)
-        assert payload == {"error": "Method not allowed"}
-
-    def test_requires_file_upload(self, request_factory):
-        """Test that process_file requires a file upload."""
-        request = request_factory.post("/cross-dock/process-file/", {"supplier_list": "test_list"})
-
-        response = process_file(request)
-
-        assert response.status_code == 400
-        payload = json.loads(response.content)
-        assert payload == {"error": "No file uploaded"}
-
-    def test_requires_excel_file_format(self, request_factory, text_file):
-        """Test that process_file only accepts Excel file formats."""
-        request = request_factory.post(
-            "/cross-dock/process-file/", {"file_upload": text_file, "supplier_list": "test_list"}
-        )
-
-        response = process_file(request)
-
-        assert response.status_code == 400
-        payload = json.loads(response.content)
-        assert payload == {"error": "Invalid file format. Only Excel files are allowed."}
-
-    def test_requires_supplier_list(self, request_factory, excel_file):
-        """Test that process_file requires a supplier list selection."""
-        request = request_factory.post("/cross-dock/process-file/", {"file_upload": excel_file})
+    @pytest.mark.parametrize(
+        ("method", "upload_fixture", "supplier_list", "expected_status", "expected_error"),
+        [
+            ("get", None, None, 405, "Method not allowed"),
+            ("put", None, None, 405, "Method not allowed"),
+            ("delete", None, None, 405, "Method not allowed"),
+            ("post", None, "test_list", 400, "No file uploaded"),
+            ("post", "text_file", "test_list", 400, "Invalid file format. Only Excel files are allowed."),
+            ("post", "excel_file", None, 400, "No supplier list selected"),
+        ],
+        ids=["get", "put", "delete", "no-file", "non-excel-file", "no-supplier-list"],
+    )
+    def test_rejects_invalid_requests(
+        self, request, request_factory, method, upload_fixture, supplier_list, expected_status, expected_error
+    ):
+        """Test that process_file rejects non-POST requests and incomplete uploads with a JSON error."""
+        data = {}
+        if upload_fixture:
+            data["file_upload"] = request.getfixturevalue(upload_fixture)
+        if supplier_list:
+            data["supplier_list"] = supplier_list
+        build_request = getattr(request_factory, method)
+        http_request = build_request(PROCESS_FILE_URL, data) if method == "post" else build_request(PROCESS_FILE_URL)
 
-        response = process_file(request)
+        response = process_file(http_request)
 
-        assert response.status_code == 400
-        payload = json.loads(response.content)
-        assert payload == {"error": "No supplier list selected"}
+        assert response.status_code == expected_status
+        assert json.loads(response.content) == {"error": expected_error}
 
 
+@pytest.mark.django_db
 class TestProcessFileSuccess:
     """Tests for successful process_file execution."""
 
     @mock.patch("cross_dock.views.process_file_task.delay")
     @mock.patch("cross_dock.views.CrossDockTask.objects.create")
     def test_file_upload_creates_task_and_redirects(
-        self, mock_create_task, mock_process_file_task, request_factory, excel_file
+        self, mock_create_task, mock_process_file_task, request_factory, excel_file, patched_view_io
     ):
         """Test that process_file handles file uploads correctly.
 
@@ -143,11 +151,7 @@ class TestProcessFileSuccess:
         request.user = mock.MagicMock(is_authenticated=True)
 
         # We only need to mock these essential services
-        with (
-            mock.patch("cross_dock.views.os.makedirs"),
-            mock.patch("builtins.open", mock.mock_open()),
-            mock.patch("common.utils.clickhouse.get_clickhouse_client") as mock_client,
-        ):
+        with mock.patch("common.utils.clickhouse.get_clickhouse_client") as mock_client:
             # Mock ClickHouse connection test
             mock_client.return_value.__enter__.return_value.execute.return_value = [(1,)]
 
@@ -170,23 +174,23 @@ class TestProcessFileSuccess:
 class TestProcessFileErrors:
     """Tests for process_file error handling."""
 
-    @mock.patch("cross_dock.views.os.makedirs")
-    def test_handles_directory_creation_error(self, mock_makedirs, request_factory, excel_file):
+    def test_handles_directory_creation_error(self, request_factory, excel_file, patched_view_io):
         """Test that process_file handles directory creation errors."""
-        mock_makedirs.side_effect = Exception("Directory creation error")
+        patched_view_io.makedirs.side_effect = Exception("Directory creation error")
         request = request_factory.post(
             "/cross-dock/process-file/", {"file_upload": excel_file, "supplier_list": "test_list"}
         )
 
-        with mock.patch("cross_dock.views.reverse", return_value="/cross_dock/tasks/"):
-            response = process_file(request)
+        response = process_file(request)
 
         # Check that we're redirected to the task list page
         assert isinstance(response, HttpResponseRedirect)
         assert response.url == "/cross_dock/tasks/"
 
     @mock.patch("common.utils.clickhouse.get_clickhouse_client")
-    def test_handles_database_connection_error(self, mock_get_clickhouse_client, request_factory, excel_file):
+    def test_handles_database_connection_error(
+        self, mock_get_clickhouse_client, request_factory, excel_file, patched_view_io
+    ):
         """Test that process_file handles database connection errors."""
         # Mock the context manager to simulate a database connection error
         mock_client_context = mock.MagicMock()
@@ -197,12 +201,7 @@ class TestProcessFileErrors:
             "/cross-dock/process-file/", {"file_upload": excel_file, "supplier_list": "test_list"}
         )
 
-        with (
-            mock.patch("cross_dock.views.os.makedirs"),
-            mock.patch("builtins.open", mock.mock_open()),
-            mock.patch("cross_dock.views.os.path.join", return_value="mock_path"),
-            mock.patch("cross_dock.views.reverse", return_value="/cross_dock/tasks/"),
-        ):
+        with mock.patch("cross_dock.views.os.path.join", return_value="mock_path"):
             response = process_file(request)
 
         # Check that we're redirected to the task list page
@@ -211,18 +210,17 @@ class TestProcessFileErrors:
 
     def test_logs_and_redirects_for_processing_exceptions(self):
         """Test that processing errors are logged and redirected to task list."""
-        from cross_dock.views import logger
 
         # Simulate the error handling in the view
         def simulate_processing_error():
             try:
                 raise Exception("Processing error")
             except Exception as e:
-                logger.exception(f"Error processing file: {e}")
+                views_logger.exception(f"Error processing file: {e}")
                 # Now we redirect instead of returning JSON
                 return HttpResponseRedirect("/cross_dock/tasks/")
 
-        with mock.patch.object(logger, "exception") as mock_logger_exception:
+        with mock.patch.object(views_logger, "exception") as mock_logger_exception:
             response = simulate_processing_error()
 
         mock_logger_exception.assert_called_once()
@@ -234,61 +232,24 @@ class TestProcessFileErrors:
 
 
 class TestFileCleanup:
-    """Tests for file cleanup after processing."""
+    """Tests for removing the temporary upload file."""
 
-    @mock.patch("cross_dock.views.os.remove")
-    def test_removes_temporary_file_after_processing(self, mock_remove):
-        """Test that temporary files are removed after processing."""
-        file_path = "/mock/path/test_file.xlsx"
+    def test_removes_temporary_file(self, tmp_path):
+        """Test that the upload file is deleted."""
+        file_path = tmp_path / "test_file.xlsx"
+        file_path.write_bytes(b"test content")
 
-        # Import the patched module to ensure we're using the mocked version
-        from cross_dock import views as cross_dock_views
+        _cleanup_upload_file(str(file_path))
 
-        try:
-            cross_dock_views.os.remove(file_path)
-        except Exception:
-            pass
+        assert not file_path.exists()
 
-        mock_remove.assert_called_once_with(file_path)
+    def test_logs_file_removal_errors(self, tmp_path):
+        """Test that a failed removal is logged as a warning instead of raising."""
+        file_path = tmp_path / "missing.xlsx"
 
-    @mock.patch("cross_dock.views.os.remove")
-    def test_handles_file_removal_errors(self, mock_remove):
-        """Test that file removal errors are properly handled and logged."""
-        file_path = "/mock/path/test_file.xlsx"
-        mock_remove.side_effect = Exception("File removal error")
-
-        # Import the patched modules to ensure we're using the mocked versions
-        from cross_dock.views import logger
-        from cross_dock.views import os as patched_os
-
-        with mock.patch.object(logger, "warning") as mock_logger_warning:
-            try:
-                patched_os.remove(file_path)
-                logger.info(f"Removed temporary upload file: {file_path}")
-            except Exception as e:
-                logger.warning(f"Failed to remove temporary upload file {file_path}: {e}")
+        with mock.patch.object(views_logger, "warning") as mock_logger_warning:
+            _cleanup_upload_file(str(file_path))
 
         mock_logger_warning.assert_called_once()
         assert "Failed to remove temporary upload file" in mock_logger_warning.call_args[0][0]
-        assert "File removal error" in mock_logger_warning.call_args[0][0]
-
-
-@pytest.mark.parametrize(
-    "http_method",
-    [
-        "get",
-        "put",
-        "delete",
-    ],
-)
-def test_process_file_rejects_non_post_methods(request_factory, http_method):
-    """Test that process_file rejects all non-POST HTTP methods."""
-    method = getattr(request_factory, http_method)
-    request = method("/cross-dock/process-file/")
-
-    response = process_file(request)
-
-    # We still return a JSON response for method validation errors
-    assert response.status_code == 405
-    payload = json.loads(response.content)
-    assert payload == {"error": "Method not allowed"}
+        assert str(file_path) in mock_logger_warning.call_args[0][0]
@@ -1,8 +1,10 @@
 import datetime
 
 import factory
+import numpy as np
 from django.utils import timezone
 from factory.django import DjangoModelFactory
+from faker import Faker
 
 from accounts.models import User
 from common.models import Supplier
@@ -14,14 +16,18 @@ from pricelens.models import (
     InvestigationStatus,
 )
 
+# One seeded generator shared by all factories: deterministic data without factory.Faker's per-call lookup
+_FAKER = Faker()
+_FAKER.seed_instance(0)
+
 
 class FailReasonFactory(DjangoModelFactory):
     class Meta:
         model = FailReason
 
     code = factory.Sequence(lambda n: f"ERROR_CODE_{n}")
-    name = factory.Faker("sentence")
-    description = factory.Faker("text")
+    name = factory.LazyFunction(_FAKER.sentence)
+    description = factory.LazyFunction(_FAKER.text)
 
 
 class SupplierFactory(DjangoModelFactory):
@@ -29,7 +35,7 @@ class SupplierFactory(DjangoModelFactory):
         model = Supplier
 
     supid = factory.Sequence(lambda n: n)
-    name = factory.Faker("company")
+    name = factory.LazyFunction(_FAKER.company)
 
 
 class UserFactory(DjangoModelFactory):
@@ -37,8 +43,9 @@ class UserFactory(DjangoModelFactory):
         model = User
         django_get_or_create = ("username",)
 
-    username = factory.Faker("user_name")
-    email = factory.Faker("email")
+    # Tests never look at the generated values; sequences are unique and skip Faker's providers
+    username = factory.Sequence(lambda n: f"user{n}")
+    email = factory.LazyAttribute(lambda user: f"{user.username}@example.com")
 
 
 class InvestigationFactory(DjangoModelFactory):
@@ -47,8 +54,8 @@ class InvestigationFactory(DjangoModelFactory):
 
     supplier = factory.SubFactory(SupplierFactory)
     fail_reason = factory.SubFactory(FailReasonFactory)
-    event_dt = factory.Faker("date_time", tzinfo=factory.LazyFunction(lambda: timezone.get_current_timezone()))
-    stage = factory.Faker("random_element", elements=["load_mail", "consolidate"])
+    event_dt = factory.LazyFunction(lambda: _FAKER.date_time(tzinfo=timezone.get_current_timezone()))
+    stage = factory.LazyFunction(lambda: _FAKER.random_element(elements=["load_mail", "consolidate"]))
     status = InvestigationStatus.OPEN
 
 
@@ -57,13 +64,13 @@ class CadenceProfileFactory(DjangoModelFactory):
         model = CadenceProfile
 
     supplier = factory.SubFactory(SupplierFactory)
-    median_gap_days = factory.Faker("pyint", min_value=1, max_value=30)
-    sd_gap = factory.Faker("pyfloat", left_digits=2, right_digits=2, positive=True)
-    days_since_last = factory.Faker("pyint", min_value=0, max_value=100)
+    median_gap_days = factory.LazyFunction(lambda: _FAKER.pyint(min_value=1, max_value=30))
+    sd_gap = factory.LazyFunction(lambda: _FAKER.pyfloat(left_digits=2, right_digits=2, positive=True))
+    days_since_last = factory.LazyFunction(lambda: _FAKER.pyint(min_value=0, max_value=100))
     last_success_date = factory.LazyAttribute(
         lambda o: timezone.now().date() - datetime.timedelta(days=o.days_since_last)
     )
-    bucket = factory.Faker("random_element", elements=BucketChoices.values)
+    bucket = factory.LazyFunction(lambda: _FAKER.random_element(elements=BucketChoices.values))
 
 
 class SupplierDataFactory(factory.Factory):
@@ -72,9 +79,12 @@ class SupplierDataFactory(factory.Factory):
     class Meta:
         model = dict
 
-    price = factory.Faker("pydecimal", left_digits=4, right_digits=2, positive=True)
-    quantity = factory.Faker("pyint", min_value=1, max_value=100)
-    supplier_name = factory.Faker("company")
+    price = factory.LazyFunction(lambda: _FAKER.pydecimal(left_digits=4, right_digits=2, positive=True))
+    quantity = factory.LazyFunction(lambda: _FAKER.pyint(min_value=1, max_value=100))
+    supplier_name = factory.LazyFunction(_FAKER.company)
+
+
+INPUT_BRANDS = ["HYUNDAI/KIA/MOBIS", "VAG", "NISSAN", "SSANGYONG"]
 
 
 class InputDataFactory(factory.Factory):
@@ -83,5 +93,22 @@ class InputDataFactory(factory.Factory):
     class Meta:
         model = dict
 
-    Бренд = factory.Faker("random_element", elements=["HYUNDAI/KIA/MOBIS", "VAG", "NISSAN", "SSANGYONG"])
-    Артикул = factory.Faker("bothify", text="#######??")
+    Бренд = factory.LazyFunction(lambda: _FAKER.random_element(elements=INPUT_BRANDS))
+    Артикул = factory.LazyFunction(lambda: _FAKER.bothify(text="#######??"))
+
+    @classmethod
+    def build_batch_np(cls, size, seed=0):
+        """
+        Build `size` input rows in one vectorized pass instead of calling Faker per row.
+
+        Articles follow the same "#######??" shape (7 digits, 2 letters) as the per-row declaration.
+        """
+        rng = np.random.default_rng(seed)
+        digits = rng.integers(ord("0"), ord("9") + 1, size=(size, 7), dtype=np.uint8)
+        letters = rng.integers(ord("a"), ord("z") + 1, size=(size, 2), dtype=np.uint8)
+        articles = np.concatenate([digits, letters], axis=1).view("S9").ravel().astype(str)
+        brands = rng.choice(INPUT_BRANDS, size=size)
+        return [
+            {"Бренд": brand, "Артикул": article}
+            for brand, article in zip(brands.tolist(), articles.tolist(), strict=True)
+        ]
@@ -0,0 +1,18 @@
+"""
+Pytest fixtures for pricelens tests.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+from django.urls import reverse
+
+
+@pytest.fixture(scope="session")
+def urls():
+    """Resolve the pricelens page URLs once per session."""
+    return SimpleNamespace(
+        dashboard=reverse("pricelens:dashboard"),
+        queue=reverse("pricelens:queue"),
+        cadence=reverse("pricelens:cadence"),
+    )
@@ -0,0 +1,31 @@
+"""
+Shared constants and data builders for the pricelens view tests.
+"""
+
+from common.models import Supplier
+from pricelens.models import CadenceProfile, FailReason, Investigation
+from tests.factories import CadenceProfileFactory, InvestigationFactory
+
+# Queries of a non-empty cadence page: session, user, row count, page rows and the user's profile in the base template
+CADENCE_PAGE_QUERIES = 5
+# The queue page additionally counts investigations per status for the filter tabs
+QUEUE_PAGE_QUERIES = 6
+# The dashboard runs its summary, top reasons, suppliers, buckets and anomalies queries besides the session ones
+DASHBOARD_PAGE_QUERIES = 8
+# Investigation page: session, user, the investigation joined to its supplier and fail reason, and the user's profile
+INVESTIGATION_PAGE_QUERIES = 4
+
+
+def create_cadence_profiles(count, **kwargs):
+    """Insert `count` cadence profiles and their suppliers with one query per table."""
+    profiles = CadenceProfileFactory.build_batch(count, **kwargs)
+    Supplier.objects.bulk_create([profile.supplier for profile in profiles])
+    return CadenceProfile.objects.bulk_create(profiles)
+
+
+def create_investigations(count, **kwargs):
+    """Insert `count` investigations with their suppliers and fail reasons with one query per table."""
+    investigations = InvestigationFactory.build_batch(count, **kwargs)
+    Supplier.objects.bulk_create([investigation.supplier for investigation in investigations])
+    FailReason.objects.bulk_create([investigation.fail_reason for investigation in investigations])
+    return Investigation.objects.bulk_create(investigations)
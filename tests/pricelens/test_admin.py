@@ -1,59 +1,69 @@
+import datetime
 from importlib import import_module
+from unittest import mock
 
 import pytest
 from django.conf import settings
 from django.contrib.admin.sites import AdminSite
 from django.contrib.messages.storage.fallback import FallbackStorage
-from django.test import RequestFactory
 from django.utils import timezone
 
 from pricelens.admin import InvestigationAdmin
 from pricelens.models import Investigation, InvestigationStatus
-from tests.factories import InvestigationFactory, UserFactory
+from tests.factories import FailReasonFactory, InvestigationFactory, SupplierFactory, UserFactory
+
+FROZEN_NOW = datetime.datetime(2025, 1, 1, tzinfo=datetime.UTC)
 
 
 @pytest.mark.django_db
 class TestInvestigationAdmin:
-    def setup_method(self):
-        """Set up the test environment before each test method."""
-        self.site = AdminSite()
-        self.admin = InvestigationAdmin(Investigation, self.site)
-        self.factory = RequestFactory()
-        self.user = UserFactory()
-
-        # Add session middleware to the request
-        engine = import_module(settings.SESSION_ENGINE)
-        session = engine.SessionStore()
-        self.request = self.factory.get("/")
-        self.request.session = session
+    @pytest.fixture(scope="class", autouse=True)
+    def _admin_setup(self, request, django_db_setup, django_db_blocker):
+        """Build the admin, session engine and acting user once for the class."""
+        cls = request.cls
+        cls.admin = InvestigationAdmin(Investigation, AdminSite())
+        cls.session_engine = import_module(settings.SESSION_ENGINE)
+        with django_db_blocker.unblock():
+            cls.user = UserFactory()
+        yield
+        with django_db_blocker.unblock():
+            cls.user.delete()
+
+    @pytest.fixture(autouse=True)
+    def _admin_request(self, request_factory):
+        """Build a fresh request with session and message storage for each test."""
+        self.request = request_factory.get("/")
+        self.request.session = self.session_engine.SessionStore()
         self.request.user = self.user
         self.request._messages = FallbackStorage(self.request)
 
+    @staticmethod
+    def _create_investigations(**kwargs):
+        """Insert three investigations for one supplier and fail reason in a single query."""
+        investigations = InvestigationFactory.build_batch(
+            3, supplier=SupplierFactory(), fail_reason=FailReasonFactory(), **kwargs
+        )
+        return Investigation.objects.bulk_create(investigations)
+
     def test_mark_resolved_action_marks_investigations_as_resolved(self):
         """Verify that the mark_resolved action correctly updates the status and investigator."""
-        investigations = InvestigationFactory.create_batch(3, status=InvestigationStatus.OPEN)
+        investigations = self._create_investigations(status=InvestigationStatus.OPEN)
         queryset = Investigation.objects.filter(id__in=[i.id for i in investigations])
 
-        self.admin.mark_resolved(self.request, queryset)
+        with mock.patch("pricelens.admin.timezone.now", return_value=FROZEN_NOW):
+            self.admin.mark_resolved(self.request, queryset)
 
-        for investigation in queryset:
-            investigation.refresh_from_db()
-            assert investigation.status == InvestigationStatus.RESOLVED
-            assert investigation.investigator == self.user
-            assert investigation.investigated_at is not None
+        rows = list(queryset.values_list("status", "investigator_id", "investigated_at"))
+        assert rows == [(InvestigationStatus.RESOLVED, self.user.id, FROZEN_NOW)] * 3
 
     def test_mark_open_action_marks_investigations_as_open(self):
         """Verify that the mark_open action reverts investigations to the open state."""
-        user = UserFactory()
-        investigations = InvestigationFactory.create_batch(
-            3, status=InvestigationStatus.RESOLVED, investigator=user, investigated_at=timezone.now()
+        investigations = self._create_investigations(
+            status=InvestigationStatus.RESOLVED, investigator=self.user, investigated_at=timezone.now()
         )
         queryset = Investigation.objects.filter(id__in=[i.id for i in investigations])
 
         self.admin.mark_open(self.request, queryset)
 
-        for investigation in queryset:
-            investigation.refresh_from_db()
-            assert investigation.status == InvestigationStatus.OPEN
-            assert investigation.investigator is None
-            assert investigation.investigated_at is None
+        rows = list(queryset.values_list("status", "investigator_id", "investigated_at"))
+        assert rows == [(InvestigationStatus.OPEN, None, None)] * 3
@@ -8,26 +8,30 @@ import pytest
 from django.urls import reverse
 from rest_framework.test import APIClient
 
+from pricelens.models import Investigation
 from tests.factories import SupplierFactory
 
+# The api_client fixture is defined in tests/conftest.py
 
-# The api_client fixture is now defined in tests/fixtures.py
+
+@pytest.fixture(scope="session")
+def log_event_url():
+    """Resolve the log-event endpoint URL once per session."""
+    return reverse("pricelens-api:log-event")
 
 
 class TestLogEventAPI:
     """Tests for the /api/v1/pricelens/log_event/ endpoint."""
 
-    def test_unauthenticated_request_is_rejected(self, db):
+    def test_unauthenticated_request_is_rejected(self, db, log_event_url):
         """Verify that anonymous users cannot access the endpoint."""
         client = APIClient()
-        url = reverse("pricelens-api:log-event")
-        response = client.post(url, data={}, content_type="application/json")
+        response = client.post(log_event_url, data={}, content_type="application/json")
         assert response.status_code == 401
 
-    def test_valid_request_creates_investigation(self, api_client):
+    def test_valid_request_creates_investigation(self, api_client, log_event_url):
         """Verify that a valid POST request creates an Investigation record."""
         supplier = SupplierFactory()
-        url = reverse("pricelens-api:log-event")
         data = {
             "event_dt": datetime.datetime.now(datetime.UTC).isoformat(),
             "supid": supplier.supid,
@@ -35,15 +39,32 @@ class TestLogEventAPI:
             "stage": "load_mail",
             "file_path": "/path/to/file.csv",
         }
-        response = api_client.post(url, data=data, content_type="application/json")
+        response = api_client.post(log_event_url, data=data, content_type="application/json")
+        assert response.status_code == 201
+
+    def test_list_of_events_creates_investigations(self, api_client, log_event_url):
+        """Verify that a list of events is logged in one request."""
+        supplier = SupplierFactory()
+        event_dt = datetime.datetime.now(datetime.UTC)
+        data = [
+            {
+                "event_dt": (event_dt + datetime.timedelta(minutes=minutes)).isoformat(),
+                "supid": supplier.supid,
+                "reason": "FILE_READ_ERROR",
+                "stage": "load_mail",
+                "file_path": "",
+            }
+            for minutes in range(3)
+        ]
+        response = api_client.post(log_event_url, data=data, format="json")
         assert response.status_code == 201
+        assert Investigation.objects.filter(supplier=supplier).count() == 3
 
-    def test_invalid_data_returns_400(self, api_client):
+    def test_invalid_data_returns_400(self, api_client, log_event_url):
         """Verify that invalid data returns a 400 Bad Request response."""
-        url = reverse("pricelens-api:log-event")
         data = {
             "event_dt": "not-a-date",
             "supid": "not-an-integer",
         }
-        response = api_client.post(url, data=data, content_type="application/json")
+        response = api_client.post(log_event_url, data=data, content_type="application/json")
         assert response.status_code == 400
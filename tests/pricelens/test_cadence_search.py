@@ -0,0 +1,119 @@
+"""
+Tests for the supplier name and supid search of the pricelens cadence view.
+"""
+
+import factory
+import pytest
+
+from common.models import Supplier
+from pricelens.models import BucketChoices
+from pricelens.views import SUPID_QUERY_RE
+from tests.factories import CadenceProfileFactory, SupplierFactory
+from tests.pricelens.helpers import CADENCE_PAGE_QUERIES, create_cadence_profiles
+
+
+@pytest.mark.django_db
+class TestCadenceViewSearch:
+    @pytest.fixture(scope="class", autouse=True)
+    def background_profiles(self, django_db_setup, django_db_blocker):
+        """Creates the profiles every search has to skip once for the class and deletes them after it."""
+        with django_db_blocker.unblock():
+            profiles = create_cadence_profiles(5, bucket=BucketChoices.CONSISTENT)
+        yield profiles
+        with django_db_blocker.unblock():
+            Supplier.objects.filter(supid__in=[profile.supplier_id for profile in profiles]).delete()
+
+    def test_cadence_view_search_by_supid(self, urls, client, authenticated_user, django_assert_num_queries):
+        """Test searching by a unique supplier ID."""
+        supplier = SupplierFactory(supid=12345)
+        CadenceProfileFactory(supplier=supplier)
+
+        url = urls.cadence
+        with django_assert_num_queries(CADENCE_PAGE_QUERIES):
+            response = client.get(url, {"q": "12345"})
+
+        assert response.status_code == 200
+        assert len(response.context["profiles"]) == 1
+        assert response.context["profiles"][0].supplier.supid == 12345
+
+    def test_cadence_view_search_by_name(self, urls, client, authenticated_user, django_assert_num_queries):
+        """Test searching by a unique supplier name."""
+        supplier = SupplierFactory(name="Specific Supplier Name")
+        CadenceProfileFactory(supplier=supplier)
+
+        url = urls.cadence
+        with django_assert_num_queries(CADENCE_PAGE_QUERIES):
+            response = client.get(url, {"q": "Specific Supplier"})
+
+        assert response.status_code == 200
+        assert len(response.context["profiles"]) == 1
+        assert response.context["profiles"][0].supplier.name == "Specific Supplier Name"
+
+    def test_cadence_view_search_combined(self, urls, client, authenticated_user, django_assert_num_queries):
+        """Test a search query that matches both a supid and a name."""
+        supplier1 = SupplierFactory(supid=54321)
+        supplier2 = SupplierFactory(name="Supplier 54321")
+        CadenceProfileFactory(supplier=supplier1)
+        CadenceProfileFactory(supplier=supplier2)
+
+        url = urls.cadence
+        with django_assert_num_queries(CADENCE_PAGE_QUERIES):
+            response = client.get(url, {"q": "54321"})
+
+        assert response.status_code == 200
+        assert response.context["page_obj"].paginator.count == 2
+
+    def test_cadence_view_search_no_results(self, urls, client, authenticated_user):
+        """Test a search query that returns no results."""
+        url = urls.cadence
+        response = client.get(url, {"q": "NON_EXISTENT_QUERY"})
+
+        assert response.status_code == 200
+        assert response.context["page_obj"].paginator.count == 0
+
+    def test_cadence_view_search_with_bucket_filter(self, urls, client, authenticated_user):
+        """Test that search and bucket filtering work together."""
+        supplier1 = SupplierFactory(name="Searchable Consistent")
+        supplier2 = SupplierFactory(name="Searchable Dead")
+        CadenceProfileFactory(supplier=supplier1, bucket=BucketChoices.CONSISTENT)
+        CadenceProfileFactory(supplier=supplier2, bucket=BucketChoices.DEAD)
+
+        url = urls.cadence
+        response = client.get(url, {"q": "Searchable", "bucket": "consistent"})
+
+        assert response.status_code == 200
+        assert len(response.context["profiles"]) == 1
+        assert response.context["profiles"][0].supplier.name == "Searchable Consistent"
+
+
+@pytest.mark.django_db
+class TestCadenceViewSupidSearch:
+    @pytest.fixture(scope="class", autouse=True)
+    def profiles(self, django_db_setup, django_db_blocker):
+        """Creates profiles for suppliers 100-104 once for all comparator cases."""
+        with django_db_blocker.unblock():
+            profiles = create_cadence_profiles(5, supplier__supid=factory.Iterator(range(100, 105)))
+        yield profiles
+        with django_db_blocker.unblock():
+            Supplier.objects.filter(supid__in=[profile.supplier_id for profile in profiles]).delete()
+
+    @pytest.mark.parametrize(
+        "query, expected_supids",
+        [
+            (">102", [103, 104]),
+            ("<103", [100, 101, 102]),
+            (">=102", [102, 103, 104]),
+            ("<=102", [100, 101, 102]),
+        ],
+    )
+    def test_cadence_view_search_supid_comparison(self, urls, client, authenticated_user, query, expected_supids):
+        """Test that a comparator query filters suppliers by supid."""
+        url = urls.cadence
+        response = client.get(url, {"q": query})
+        assert response.status_code == 200
+        assert sorted(profile.supplier_id for profile in response.context["profiles"]) == expected_supids
+
+    @pytest.mark.parametrize("query", ["102", "abc", "=102", "> 102"])
+    def test_supid_query_regex_rejects_non_comparator(self, query):
+        """Test that only an operator directly followed by digits is treated as a supid comparison."""
+        assert SUPID_QUERY_RE.match(query) is None
@@ -6,7 +6,7 @@ import datetime
 
 import pytest
 from django.contrib.auth import get_user_model
-from django.db import IntegrityError
+from django.db import IntegrityError, connection
 from django.test import override_settings
 
 from common.models import Supplier
@@ -24,16 +24,24 @@ User = get_user_model()
 pytestmark = pytest.mark.django_db
 
 
-@pytest.fixture
-def user():
-    """Provides a user instance for foreign key relations."""
-    return User.objects.create_user(username="testuser", password="testpassword")
+@pytest.fixture(scope="module")
+def user(django_db_setup, django_db_blocker):
+    """Provides a user instance for foreign key relations, created once for the module."""
+    with django_db_blocker.unblock():
+        user = User.objects.create_user(username="testuser", password="testpassword")
+    yield user
+    with django_db_blocker.unblock():
+        user.delete()
 
 
-@pytest.fixture
-def supplier():
-    """Provides a supplier instance for foreign key relations."""
-    return Supplier.objects.create(supid=1234, name="Test Supplier")
+@pytest.fixture(scope="module")
+def supplier(django_db_setup, django_db_blocker):
+    """Provides a supplier instance for foreign key relations, created once for the module."""
+    with django_db_blocker.unblock():
+        supplier = Supplier.objects.create(supid=1234, name="Test Supplier")
+    yield supplier
+    with django_db_blocker.unblock():
+        supplier.delete()
 
 
 @pytest.fixture
@@ -63,11 +71,17 @@ class TestInvestigationModel:
         assert investigation.investigator == user
         assert investigation.created_at is not None
 
-    def test_default_values(self, supplier, fail_reason):
+    def test_unique_event_constraint(self, supplier, fail_reason):
+        """Test that the same event cannot be logged twice for a supplier and fail reason."""
+        event_dt = datetime.datetime.now(datetime.timezone.utc)  # noqa
+        Investigation.objects.create(supplier=supplier, fail_reason=fail_reason, event_dt=event_dt, stage="load_mail")
+        with pytest.raises(IntegrityError):
+            Investigation.objects.create(supplier=supplier, fail_reason=fail_reason, event_dt=event_dt, stage="airflow")
+
+    def test_default_values(self):
         """Test that default values are set correctly."""
-        investigation = Investigation.objects.create(
-            supplier=supplier,
-            fail_reason=fail_reason,
+        # Field defaults are applied on instantiation, so no database round trip is needed
+        investigation = Investigation(
             event_dt=datetime.datetime.now(datetime.timezone.utc),  # noqa
             stage="test",
         )
@@ -159,3 +173,24 @@ class TestFailReasonModel:
         FailReason.objects.create(code="UNIQUE_CODE", name="Name 1")
         with pytest.raises(IntegrityError):
             FailReason.objects.create(code="UNIQUE_CODE", name="Name 2")
+
+
+def _leading_index_columns(model):
+    """Returns the first column of every index, unique constraint and primary key on the model's table."""
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+    return {
+        constraint["columns"][0]
+        for constraint in constraints.values()
+        if constraint["columns"] and (constraint["index"] or constraint["primary_key"] or constraint["unique"])
+    }
+
+
+class TestSearchIndexes:
+    """The cadence view range-scans Supplier.supid and filters CadenceProfile.bucket; both must be indexed."""
+
+    def test_supplier_supid_is_indexed(self):
+        assert Supplier._meta.get_field("supid").column in _leading_index_columns(Supplier)
+
+    def test_cadence_profile_bucket_is_indexed(self):
+        assert CadenceProfile._meta.get_field("bucket").column in _leading_index_columns(CadenceProfile)
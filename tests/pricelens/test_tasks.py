@@ -5,31 +5,51 @@ These tests verify the logic of the asynchronous tasks in `pricelens.tasks`,
 ensuring they correctly process data and interact with the database.
 """
 
-import pytest
-from unittest.mock import MagicMock, patch
+import contextlib
+import datetime
+import zoneinfo
 
-import pandas as pd
+import pytest
+from unittest.mock import Mock
+from clickhouse_connect.driver.httpclient import HttpClient
 
 from common.models import Supplier
 from pricelens.models import CadenceProfile, Investigation
 from pricelens.tasks import backfill_suppliers_task, refresh_cadence_profiles_task, backfill_investigations_task
 from tests.factories import SupplierFactory, InvestigationFactory, FailReasonFactory
 
+pytestmark = pytest.mark.django_db
+
+TODAY = datetime.date.today()
+# ClickHouse returns naive Moscow-time datetimes; the task localizes them
+EVENT_DT = datetime.datetime(2025, 8, 6, 10, 0)
+EVENT_DT_MSK = EVENT_DT.replace(tzinfo=zoneinfo.ZoneInfo("Europe/Moscow"))
+
+
+@pytest.fixture
+def clickhouse_client(monkeypatch):
+    """Patch the tasks' ClickHouse connection and return the mock client it yields."""
+    # Specced on the client get_clickhouse_client yields, so calling a method it lacks fails the test
+    mock_client = Mock(spec=HttpClient)
+    monkeypatch.setattr(
+        "pricelens.tasks.get_clickhouse_client", lambda *args, **kwargs: contextlib.nullcontext(mock_client)
+    )
+    return mock_client
+
+
+def _stream_rows(client, rows):
+    """Serve `rows` as the single block of the client's next query_row_block_stream."""
+    client.query_row_block_stream.return_value = contextlib.nullcontext([rows])
+
 
 class TestBackfillSuppliersTask:
-    def test_creates_and_updates_suppliers_correctly(self, monkeypatch):
+    def test_creates_and_updates_suppliers_correctly(self, clickhouse_client):
         """Verify that the task creates new suppliers and updates existing ones."""
         existing_supplier = SupplierFactory(supid=1, name="Old Name")
 
         mock_ch_data = [(1, "New Name"), (2, "New Supplier")]
 
-        mock_client = MagicMock()
-        mock_client.execute.return_value = mock_ch_data
-
-        mock_get_client = MagicMock()
-        mock_get_client.return_value.__enter__.return_value = mock_client
-
-        monkeypatch.setattr("pricelens.tasks.get_clickhouse_client", mock_get_client)
+        clickhouse_client.query.return_value.result_rows = mock_ch_data
 
         backfill_suppliers_task.delay()
 
@@ -41,110 +61,49 @@ class TestBackfillSuppliersTask:
 
 
 class TestRefreshCadenceProfilesTask:
-    def test_creates_profile_for_new_supplier(self, monkeypatch):
+    # Cadence rows are (supid, med_gap, sd_gap, days_since_last, last_success_date, total_gaps, bad_gaps)
+
+    def test_creates_profile_for_new_supplier(self, clickhouse_client):
         """Verify that a new cadence profile is created with the correct bucket."""
         SupplierFactory(supid=1)
 
-        mock_df = pd.DataFrame({
-            "supid": [1],
-            "med_gap": [5.0],
-            "sd_gap": [2.0],
-            "days_since_last": [3],
-            "last_success_date": [pd.to_datetime("today").date()],
-            "total_gaps": [10],
-            "bad_gaps": [1]
-        })
-
-        mock_client = MagicMock()
-        mock_client.query_dataframe.return_value = mock_df
-
-        mock_get_client = MagicMock()
-        mock_get_client.return_value.__enter__.return_value = mock_client
-
-        monkeypatch.setattr("pricelens.tasks.get_clickhouse_client", mock_get_client)
+        _stream_rows(clickhouse_client, [(1, 5.0, 2.0, 3, TODAY, 10, 1)])
 
         refresh_cadence_profiles_task.delay()
 
         assert CadenceProfile.objects.count() == 1
         profile = CadenceProfile.objects.get(supplier_id=1)
         assert profile.bucket == "consistent"
+        clickhouse_client.command.assert_called_once()
 
-    def test_identifies_dead_supplier(self, monkeypatch):
+    def test_identifies_dead_supplier(self, clickhouse_client):
         """Verify that a supplier with no recent data is marked as dead."""
         SupplierFactory(supid=1)
 
-        mock_df = pd.DataFrame({
-            "supid": [1],
-            "med_gap": [5.0],
-            "sd_gap": [2.0],
-            "days_since_last": [30],
-            "last_success_date": [pd.to_datetime("today").date() - pd.Timedelta(days=30)],
-            "total_gaps": [10],
-            "bad_gaps": [1]
-        })
-
-        mock_client = MagicMock()
-        mock_client.query_dataframe.return_value = mock_df
-
-        mock_get_client = MagicMock()
-        mock_get_client.return_value.__enter__.return_value = mock_client
-
-        monkeypatch.setattr("pricelens.tasks.get_clickhouse_client", mock_get_client)
+        last_success_date = TODAY - datetime.timedelta(days=30)
+        _stream_rows(clickhouse_client, [(1, 5.0, 2.0, 30, last_success_date, 10, 1)])
 
         refresh_cadence_profiles_task.delay()
 
         profile = CadenceProfile.objects.get(supplier_id=1)
         assert profile.bucket == "dead"
 
-    def test_identifies_inconsistent_supplier(self, monkeypatch):
+    def test_identifies_inconsistent_supplier(self, clickhouse_client):
         """Verify that a supplier with high deviation is marked as inconsistent."""
         SupplierFactory(supid=1)
 
-        mock_df = pd.DataFrame({
-            "supid": [1],
-            "med_gap": [5.0],
-            "sd_gap": [8.0],
-            "days_since_last": [3],
-            "last_success_date": [pd.to_datetime("today").date()],
-            "total_gaps": [10],
-            "bad_gaps": [4]  # 40% bad gaps
-        })
-
-        mock_client = MagicMock()
-        mock_client.query_dataframe.return_value = mock_df
-
-        mock_get_client = MagicMock()
-        mock_get_client.return_value.__enter__.return_value = mock_client
-
-        monkeypatch.setattr("pricelens.tasks.get_clickhouse_client", mock_get_client)
+        _stream_rows(clickhouse_client, [(1, 5.0, 8.0, 3, TODAY, 10, 4)])  # 40% bad gaps
 
         refresh_cadence_profiles_task.delay()
 
         profile = CadenceProfile.objects.get(supplier_id=1)
         assert profile.bucket == "inconsistent"
 
-    def test_handles_new_supplier_with_one_success(self, monkeypatch):
+    def test_handles_new_supplier_with_one_success(self, clickhouse_client):
         """Verify that a supplier with one success is put in the 'new' bucket."""
         SupplierFactory(supid=1)
 
-        mock_df = pd.DataFrame({
-            "supid": [1],
-            "days": [[pd.to_datetime("today").date()]],
-            "med_gap": [None],
-            "sd_gap": [None],
-            "days_since_last": [1],
-            "last_success_date": [pd.to_datetime("today").date()],
-            "total_gaps": [0],
-            "bad_gaps": [0]
-        })
-
-        mock_client = MagicMock()
-        mock_client.query_dataframe.return_value = mock_df
-
-        mock_get_client = MagicMock()
-        mock_get_client.return_value.__enter__.return_value = mock_client
-
-        monkeypatch.setattr("pricelens.tasks.get_clickhouse_client", mock_get_client)
+        _stream_rows(clickhouse_client, [(1, None, None, 1, TODAY, 0, 0)])
 
         refresh_cadence_profiles_task.delay()
 
@@ -155,29 +114,22 @@ class TestRefreshCadenceProfilesTask:
 
 
 class TestBackfillInvestigationsTask:
-    def test_backfills_missing_investigations(self, monkeypatch):
+    def test_backfills_missing_investigations(self, clickhouse_client):
         """Verify that the task adds new investigations and ignores existing ones."""
         supplier = SupplierFactory(supid=1)
         reason = FailReasonFactory(code="Test Error")
         InvestigationFactory(
             supplier=supplier,
             fail_reason=reason,
-            event_dt=pd.to_datetime("2025-08-06 10:00:00").tz_localize("Europe/Moscow")
+            event_dt=EVENT_DT_MSK
         )
 
-        mock_df = pd.DataFrame({
-            "event_dt": [pd.to_datetime("2025-08-06 10:00:00"), pd.to_datetime("2025-08-06 12:00:00")],
-            "supid": [1, 1],
-            "error_text": ["Test Error", "New Error"]
-        })
-
-        mock_client = MagicMock()
-        mock_client.query_dataframe.return_value = mock_df
-
-        mock_get_client = MagicMock()
-        mock_get_client.return_value.__enter__.return_value = mock_client
+        mock_rows = [
+            (EVENT_DT, 1, "Test Error"),
+            (EVENT_DT + datetime.timedelta(hours=2), 1, "New Error"),
+        ]
 
-        monkeypatch.setattr("pricelens.tasks.get_clickhouse_client", mock_get_client)
+        _stream_rows(clickhouse_client, mock_rows)
 
         backfill_investigations_task.delay()
 
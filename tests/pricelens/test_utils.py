@@ -4,11 +4,21 @@ Tests for pricelens utility functions.
 
 import datetime
 
+import pandas as pd
 import pytest
 
 from common.models import Supplier
-from pricelens.models import FailReason, Investigation
-from pricelens.utils import log_investigation_event
+from pricelens.models import CadenceProfile, FailReason, Investigation
+from pricelens.utils import (
+    build_missing_investigations,
+    classify_cadence_profiles,
+    get_fail_reason_ids,
+    log_investigation_event,
+    log_investigation_events,
+    save_cadence_profiles,
+    save_suppliers,
+)
+from tests.factories import CadenceProfileFactory
 
 
 @pytest.mark.django_db
@@ -73,3 +83,165 @@ class TestLogInvestigationEvent:
         assert FailReason.objects.count() == initial_reason_count + 1
         new_reason = FailReason.objects.get(code=reason_code)
         assert new_reason.name == reason_code  # Defaults to code
+
+    def test_recreates_deleted_fail_reason(self):
+        """Verify that a reason deleted between two events is recreated instead of reusing its old id."""
+        supplier = Supplier.objects.create(supid=2468, name="Deleted Reason Supplier")
+        params = {"supid": supplier.supid, "reason": "FILE_READ_ERROR", "stage": "load_mail", "file_path": ""}
+        log_investigation_event(event_dt=datetime.datetime.now(datetime.UTC), **params)
+        FailReason.objects.filter(code="FILE_READ_ERROR").delete()
+
+        log_investigation_event(event_dt=datetime.datetime.now(datetime.UTC), **params)
+
+        investigation = Investigation.objects.get(fail_reason__isnull=False)
+        assert investigation.fail_reason == FailReason.objects.get(code="FILE_READ_ERROR")
+
+
+@pytest.mark.django_db
+class TestLogInvestigationEvents:
+    """Tests for the log_investigation_events utility function."""
+
+    def test_logs_known_suppliers_and_skips_duplicates(self):
+        """Verify that a batch skips unknown suppliers and events that are already logged."""
+        supplier = Supplier.objects.create(supid=4321, name="Batch Supplier")
+        event_time = datetime.datetime.now(datetime.UTC)
+        event = {
+            "event_dt": event_time,
+            "supid": supplier.supid,
+            "reason": "FILE_READ_ERROR",
+            "stage": "load_mail",
+            "file_path": "",
+        }
+        log_investigation_event(**event)
+
+        logged = log_investigation_events(
+            [
+                event,
+                {**event, "event_dt": event_time + datetime.timedelta(hours=1), "reason": "PRICE_TOO_LOW"},
+                {**event, "supid": 999999},
+            ]
+        )
+
+        assert logged == 2
+        assert set(Investigation.objects.values_list("fail_reason__code", flat=True)) == {
+            "FILE_READ_ERROR",
+            "PRICE_TOO_LOW",
+        }
+        assert Investigation.objects.count() == 2
+
+
+@pytest.mark.django_db
+class TestGetFailReasonIds:
+    """Tests for the get_fail_reason_ids utility function."""
+
+    def test_returns_existing_and_creates_missing_reasons(self):
+        """Verify that known codes keep their ids and unknown codes get new reasons."""
+        existing = FailReason.objects.create(code="KNOWN", name="Known", description="")
+
+        reason_ids = get_fail_reason_ids(["KNOWN", "UNKNOWN", "UNKNOWN"])
+
+        assert reason_ids["KNOWN"] == existing.id
+        assert FailReason.objects.get(code="UNKNOWN").id == reason_ids["UNKNOWN"]
+        assert FailReason.objects.get(code="UNKNOWN").name == "UNKNOWN"
+
+
+@pytest.mark.django_db
+class TestBuildMissingInvestigations:
+    """Tests for the build_missing_investigations utility function."""
+
+    def test_skips_existing_and_duplicate_rows(self):
+        """Verify that only keys missing from the database are returned, once each."""
+        supplier = Supplier.objects.create(supid=4321, name="Backfill Supplier")
+        logged_at = pd.Timestamp("2025-08-06 10:00:00", tz="Europe/Moscow")
+        log_investigation_event(
+            event_dt=logged_at.to_pydatetime(), supid=supplier.supid, reason="OLD", stage="load_mail", file_path=""
+        )
+        new_at = pd.Timestamp("2025-08-06 12:00:00", tz="Europe/Moscow")
+        rows = pd.DataFrame(
+            {
+                "event_dt": [logged_at, new_at, new_at],
+                "supid": [supplier.supid] * 3,
+                "error_text": ["OLD", "NEW", "NEW"],
+            }
+        )
+
+        investigations = build_missing_investigations(rows)
+
+        assert len(investigations) == 1
+        assert investigations[0].event_dt == new_at
+        assert investigations[0].supplier_id == supplier.supid
+        assert investigations[0].fail_reason_id == FailReason.objects.get(code="NEW").id
+        assert investigations[0].stage == "consolidate"
+
+
+class TestClassifyCadenceProfiles:
+    """Tests for the classify_cadence_profiles utility function."""
+
+    def test_assigns_buckets(self):
+        """Verify the bucket rules for every kind of supplier in one frame."""
+        today = datetime.date.today()
+        rows = pd.DataFrame(
+            {
+                "supid": [1, 2, 3, 4, 5, 6],
+                "med_gap": [5.0, 5.0, 5.0, 5.0, None, 0.0],
+                "sd_gap": [2.0, 2.0, 8.0, 8.0, None, 0.0],
+                "days_since_last": [3, 30, 3, 3, 1, 2],
+                "last_success_date": [today] * 6,
+                "total_gaps": [10, 10, 10, 10, 0, 3],
+                "bad_gaps": [1, 1, 4, 1, 0, 0],
+            }
+        )
+
+        profiles = classify_cadence_profiles(rows)
+
+        assert profiles["bucket"].tolist() == ["consistent", "dead", "inconsistent", "consistent", "new", "new"]
+        assert profiles["median_gap_days"].tolist() == [5, 5, 5, 5, None, None]
+        assert profiles["sd_gap"].tolist() == [2.0, 2.0, 8.0, 8.0, None, None]
+        assert profiles["supplier_id"].tolist() == [1, 2, 3, 4, 5, 6]
+
+
+@pytest.mark.django_db
+class TestSaveCadenceProfiles:
+    """Tests for the save_cadence_profiles utility function."""
+
+    def test_creates_and_updates_profiles(self):
+        """Verify that new suppliers get a profile and existing profiles are overwritten."""
+        existing = CadenceProfileFactory(bucket="dead")
+        new_supplier = Supplier.objects.create(supid=777, name="Fresh Supplier")
+        today = datetime.date.today()
+        profiles = pd.DataFrame(
+            {
+                "supplier_id": [existing.supplier_id, new_supplier.supid],
+                "median_gap_days": [2, None],
+                "sd_gap": [0.5, None],
+                "days_since_last": [1, 0],
+                "last_success_date": [today, today],
+                "bucket": ["consistent", "new"],
+            }
+        )
+
+        created_count, updated_count = save_cadence_profiles(profiles)
+
+        assert (created_count, updated_count) == (1, 1)
+        assert CadenceProfile.objects.count() == 2
+        existing.refresh_from_db()
+        assert (existing.bucket, existing.median_gap_days, existing.sd_gap) == ("consistent", 2, 0.5)
+        assert CadenceProfile.objects.get(supplier_id=777).median_gap_days is None
+
+
+@pytest.mark.django_db
+class TestSaveSuppliers:
+    """Tests for the save_suppliers utility function."""
+
+    def test_creates_and_updates_suppliers(self):
+        """Verify that new suppliers are created, existing ones renamed and missing names defaulted."""
+        Supplier.objects.create(supid=1, name="Old Name")
+
+        created, updated = save_suppliers([(1, "New Name"), (2, "New Supplier"), (3, None)])
+
+        assert (created, updated) == (2, 1)
+        assert dict(Supplier.objects.values_list("supid", "name")) == {
+            1: "New Name",
+            2: "New Supplier",
+            3: "Supplier 3",
+        }
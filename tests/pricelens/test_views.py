@@ -1,25 +1,38 @@
 import pytest
 import re
-import factory
 from django.urls import reverse
 from django.utils import timezone
+from pytest_django.asserts import assertTemplateUsed
 import datetime
 
-from pricelens.models import BucketChoices, InvestigationStatus
-from tests.factories import CadenceProfileFactory, InvestigationFactory, SupplierFactory
+from common.models import Supplier
+from pricelens.models import BucketChoices, FailReason, InvestigationStatus
+from pricelens.views import CadenceView, QueueView
+from tests.factories import CadenceProfileFactory, InvestigationFactory
+from tests.pricelens.helpers import (
+    CADENCE_PAGE_QUERIES,
+    DASHBOARD_PAGE_QUERIES,
+    INVESTIGATION_PAGE_QUERIES,
+    QUEUE_PAGE_QUERIES,
+    create_cadence_profiles,
+    create_investigations,
+)
 
 
+@pytest.mark.django_db
 class TestDashboardView:
-    def test_dashboard_view_get_success(self, client, authenticated_user):
+    def test_dashboard_view_get_success(self, urls, client, authenticated_user):
         """Test that the DashboardView returns a 200 OK response."""
-        url = reverse("pricelens:dashboard")
+        url = urls.dashboard
         response = client.get(url)
         assert response.status_code == 200
-        assert "pricelens/dashboard.html" in [t.name for t in response.templates]
+        assertTemplateUsed(response, "pricelens/dashboard.html")
 
-    def test_dashboard_view_context_data(self, client, authenticated_user):
+    def test_dashboard_view_context_data(self, urls, client, authenticated_user, monkeypatch):
         """Test that the dashboard view provides correctly filtered context data."""
-        today = timezone.now()
+        # Freeze the view's clock at midday so "yesterday" cannot shift while the test runs around midnight
+        today = timezone.make_aware(datetime.datetime(2024, 6, 1, 12))
+        monkeypatch.setattr("pricelens.views.timezone.now", lambda: today)
         yesterday = today - datetime.timedelta(days=1)
         day_before = today - datetime.timedelta(days=2)
 
@@ -27,7 +40,7 @@ class TestDashboardView:
         InvestigationFactory(event_dt=yesterday)  # Should be counted
         InvestigationFactory(event_dt=day_before)  # Should be ignored
 
-        url = reverse("pricelens:dashboard")
+        url = urls.dashboard
         response = client.get(url)
 
         assert "summary" in response.context
@@ -37,15 +50,70 @@ class TestDashboardView:
         assert "buckets" in response.context
         assert "anomalies" in response.context
 
+    def test_dashboard_view_query_count(self, urls, client, authenticated_user, django_assert_num_queries):
+        """Test that the anomalies table does not query suppliers row by row."""
+        create_cadence_profiles(5, bucket=BucketChoices.CONSISTENT, median_gap_days=1, days_since_last=10)
+        url = urls.dashboard
+        with django_assert_num_queries(DASHBOARD_PAGE_QUERIES):
+            response = client.get(url)
+        assert len(response.context["anomalies"]) == 5
+
 
 @pytest.mark.django_db
 class TestQueueView:
-    def test_queue_view_get_success(self, client, authenticated_user):
+    def test_queue_view_get_success(self, urls, client, authenticated_user):
         """Test that the QueueView returns a 200 OK response."""
-        url = reverse("pricelens:queue")
+        url = urls.queue
         response = client.get(url)
         assert response.status_code == 200
-        assert "pricelens/queue.html" in [t.name for t in response.templates]
+        assertTemplateUsed(response, "pricelens/queue.html")
+
+    def test_queue_view_query_count(self, urls, client, authenticated_user, django_assert_num_queries):
+        """Test that suppliers and fail reasons are joined into the page query."""
+        create_investigations(5, status=InvestigationStatus.OPEN)
+        url = urls.queue
+        with django_assert_num_queries(QUEUE_PAGE_QUERIES):
+            response = client.get(url)
+        assert len(response.context["investigations"]) == 5
+
+    def test_queue_view_pagination(self, urls, client, authenticated_user, django_assert_num_queries, monkeypatch):
+        """Test that pagination works correctly in the QueueView."""
+        # A small page size exercises the same pagination with a tenth of the rows
+        monkeypatch.setattr(QueueView, "paginate_by", 5)
+        create_investigations(6)
+
+        url = urls.queue
+        with django_assert_num_queries(QUEUE_PAGE_QUERIES):
+            response = client.get(url)
+
+        assert response.status_code == 200
+        assert len(response.context["investigations"]) == 5
+        assert response.context["is_paginated"]
+        assert response.context["page_obj"].number == 1
+
+        with django_assert_num_queries(QUEUE_PAGE_QUERIES):
+            response = client.get(url + "?page=2")
+        assert response.status_code == 200
+        assert len(response.context["investigations"]) == 1
+        assert response.context["page_obj"].number == 2
+
+
+@pytest.mark.django_db
+class TestQueueViewFiltering:
+    @pytest.fixture(scope="class", autouse=True)
+    def investigations(self, django_db_setup, django_db_blocker):
+        """Creates the status mix once for all filtering cases and deletes it after the class."""
+        with django_db_blocker.unblock():
+            investigations = [
+                *create_investigations(5, status=InvestigationStatus.OPEN),
+                *create_investigations(3, status=InvestigationStatus.RESOLVED),
+                *create_investigations(2, status=InvestigationStatus.UNRESOLVED),
+            ]
+        yield investigations
+        with django_db_blocker.unblock():
+            # Deleting the suppliers cascades to their investigations
+            Supplier.objects.filter(supid__in=[i.supplier_id for i in investigations]).delete()
+            FailReason.objects.filter(id__in=[i.fail_reason_id for i in investigations]).delete()
 
     @pytest.mark.parametrize(
         "status, expected_count",
@@ -56,35 +124,14 @@ class TestQueueView:
             ("all", 10),
         ],
     )
-    def test_queue_view_filtering(self, client, authenticated_user, status, expected_count):
+    def test_queue_view_filtering(self, urls, client, authenticated_user, status, expected_count):
         """Test that the QueueView correctly filters by status."""
-        InvestigationFactory.create_batch(5, status=InvestigationStatus.OPEN)
-        InvestigationFactory.create_batch(3, status=InvestigationStatus.RESOLVED)
-        InvestigationFactory.create_batch(2, status=InvestigationStatus.UNRESOLVED)
-
-        url = reverse("pricelens:queue")
+        url = urls.queue
         # The view expects the integer value of the status enum
         status_val = status if status == "all" else status.value
         response = client.get(url, {"status": status_val})
         assert response.status_code == 200
-        assert len(response.context["investigations"]) == expected_count
-
-    def test_queue_view_pagination(self, client, authenticated_user):
-        """Test that pagination works correctly in the QueueView."""
-        InvestigationFactory.create_batch(60)
-
-        url = reverse("pricelens:queue")
-        response = client.get(url)
-
-        assert response.status_code == 200
-        assert len(response.context["investigations"]) == 50
-        assert response.context["is_paginated"]
-        assert response.context["page_obj"].number == 1
-
-        response = client.get(url + "?page=2")
-        assert response.status_code == 200
-        assert len(response.context["investigations"]) == 10
-        assert response.context["page_obj"].number == 2
+        assert response.context["page_obj"].paginator.count == expected_count
 
 
 @pytest.mark.django_db
@@ -98,7 +145,7 @@ class TestInvestigationDetailView:
         url = reverse("pricelens:investigate", kwargs={"pk": investigation.pk})
         response = client.get(url)
         assert response.status_code == 200
-        assert "pricelens/investigate.html" in [t.name for t in response.templates]
+        assertTemplateUsed(response, "pricelens/investigate.html")
 
     def test_investigation_detail_view_context_data(self, client, authenticated_user, investigation):
         """Test that the detail view provides the investigation object in the context."""
@@ -106,7 +153,15 @@ class TestInvestigationDetailView:
         response = client.get(url)
         assert response.context["investigation"] == investigation
 
-    def test_investigation_detail_view_update(self, client, authenticated_user, investigation):
+    def test_investigation_detail_view_query_count(
+        self, client, authenticated_user, investigation, django_assert_num_queries
+    ):
+        """Test that the supplier and fail reason are loaded with the investigation."""
+        url = reverse("pricelens:investigate", kwargs={"pk": investigation.pk})
+        with django_assert_num_queries(INVESTIGATION_PAGE_QUERIES):
+            client.get(url)
+
+    def test_investigation_detail_view_update(self, urls, client, authenticated_user, investigation):
         """Test that the InvestigationDetailView correctly updates the investigation."""
         url = reverse("pricelens:investigate", kwargs={"pk": investigation.pk})
         data = {
@@ -115,7 +170,7 @@ class TestInvestigationDetailView:
         }
         response = client.post(url, data)
         assert response.status_code == 302
-        assert response.url == reverse("pricelens:queue")
+        assert response.url == urls.queue
 
         investigation.refresh_from_db()
         assert investigation.note == "This is a test note."
@@ -124,20 +179,20 @@ class TestInvestigationDetailView:
 
 
 @pytest.mark.django_db
-class TestCadenceView:
-    @pytest.fixture
-    def cadence_profiles(self):
-        """Fixture for creating a batch of cadence profiles for testing filtering."""
-        CadenceProfileFactory.create_batch(5, bucket=BucketChoices.CONSISTENT)
-        CadenceProfileFactory.create_batch(3, bucket=BucketChoices.INCONSISTENT)
-        CadenceProfileFactory.create_batch(2, bucket=BucketChoices.DEAD)
-
-    def test_cadence_view_get_success(self, client, authenticated_user):
-        """Test that the CadenceView returns a 200 OK response."""
-        url = reverse("pricelens:cadence")
-        response = client.get(url)
-        assert response.status_code == 200
-        assert "pricelens/cadence.html" in [t.name for t in response.templates]
+class TestCadenceViewFiltering:
+    @pytest.fixture(scope="class", autouse=True)
+    def cadence_profiles(self, django_db_setup, django_db_blocker):
+        """Creates the bucket mix once for all filtering cases and deletes it after the class."""
+        with django_db_blocker.unblock():
+            profiles = [
+                *create_cadence_profiles(5, bucket=BucketChoices.CONSISTENT),
+                *create_cadence_profiles(3, bucket=BucketChoices.INCONSISTENT),
+                *create_cadence_profiles(2, bucket=BucketChoices.DEAD),
+            ]
+        yield profiles
+        with django_db_blocker.unblock():
+            # Deleting the suppliers cascades to their profiles
+            Supplier.objects.filter(supid__in=[profile.supplier_id for profile in profiles]).delete()
 
     @pytest.mark.parametrize(
         "bucket, expected_count",
@@ -148,20 +203,38 @@ class TestCadenceView:
             ("all", 10),
         ],
     )
-    def test_cadence_view_filtering(self, client, authenticated_user, cadence_profiles, bucket, expected_count):
+    def test_cadence_view_filtering(self, urls, client, authenticated_user, bucket, expected_count):
         """Test that the CadenceView correctly filters by bucket."""
-        url = reverse("pricelens:cadence")
+        url = urls.cadence
         response = client.get(url, {"bucket": bucket})
         assert response.status_code == 200
-        assert len(response.context["profiles"]) == expected_count
+        assert response.context["page_obj"].paginator.count == expected_count
+
 
-    def test_cadence_view_sorting(self, client, authenticated_user):
+@pytest.mark.django_db
+class TestCadenceView:
+    def test_cadence_view_get_success(self, urls, client, authenticated_user):
+        """Test that the CadenceView returns a 200 OK response."""
+        url = urls.cadence
+        response = client.get(url)
+        assert response.status_code == 200
+        assertTemplateUsed(response, "pricelens/cadence.html")
+
+    def test_cadence_view_query_count(self, urls, client, authenticated_user, django_assert_num_queries):
+        """Test that suppliers are joined into the page query."""
+        create_cadence_profiles(5)
+        url = urls.cadence
+        with django_assert_num_queries(CADENCE_PAGE_QUERIES):
+            response = client.get(url)
+        assert len(response.context["profiles"]) == 5
+
+    def test_cadence_view_sorting(self, urls, client, authenticated_user):
         """Test that the CadenceView correctly sorts by days_since_last."""
         CadenceProfileFactory.create(days_since_last=10)
         CadenceProfileFactory.create(days_since_last=5)
         CadenceProfileFactory.create(days_since_last=20)
 
-        url = reverse("pricelens:cadence")
+        url = urls.cadence
         response = client.get(url)
 
         assert response.status_code == 200
@@ -171,122 +244,29 @@ class TestCadenceView:
         assert profiles[1].days_since_last == 10
         assert profiles[2].days_since_last == 20
 
-    def test_cadence_view_pagination(self, client, authenticated_user):
+    def test_cadence_view_pagination(self, urls, client, authenticated_user, django_assert_num_queries, monkeypatch):
         """Test that pagination works correctly in the CadenceView."""
-        CadenceProfileFactory.create_batch(60)
+        # A small page size exercises the same pagination with a tenth of the rows
+        monkeypatch.setattr(CadenceView, "paginate_by", 5)
+        create_cadence_profiles(6)
 
-        url = reverse("pricelens:cadence")
-        response = client.get(url)
+        url = urls.cadence
+        with django_assert_num_queries(CADENCE_PAGE_QUERIES):
+            response = client.get(url)
 
         assert response.status_code == 200
-        assert len(response.context["profiles"]) == 50
+        assert len(response.context["profiles"]) == 5
         assert response.context["is_paginated"]
         assert response.context["page_obj"].number == 1
 
         # Check the second page
-        response = client.get(url + "?page=2")
-        assert response.status_code == 200
-        assert len(response.context["profiles"]) == 10
-        assert response.context["page_obj"].number == 2
-
-    def test_cadence_view_search_by_supid(self, client, authenticated_user):
-        """Test searching by a unique supplier ID."""
-        supplier = SupplierFactory(supid=12345)
-        CadenceProfileFactory(supplier=supplier)
-        CadenceProfileFactory.create_batch(5)  # Other profiles
-
-        url = reverse("pricelens:cadence")
-        response = client.get(url, {"q": "12345"})
-
-        assert response.status_code == 200
-        assert len(response.context["profiles"]) == 1
-        assert response.context["profiles"][0].supplier.supid == 12345
-
-    def test_cadence_view_search_by_name(self, client, authenticated_user):
-        """Test searching by a unique supplier name."""
-        supplier = SupplierFactory(name="Specific Supplier Name")
-        CadenceProfileFactory(supplier=supplier)
-        CadenceProfileFactory.create_batch(5)
-
-        url = reverse("pricelens:cadence")
-        response = client.get(url, {"q": "Specific Supplier"})
-
-        assert response.status_code == 200
-        assert len(response.context["profiles"]) == 1
-        assert response.context["profiles"][0].supplier.name == "Specific Supplier Name"
-
-    def test_cadence_view_search_combined(self, client, authenticated_user):
-        """Test a search query that matches both a supid and a name."""
-        supplier1 = SupplierFactory(supid=54321)
-        supplier2 = SupplierFactory(name="Supplier 54321")
-        CadenceProfileFactory(supplier=supplier1)
-        CadenceProfileFactory(supplier=supplier2)
-        CadenceProfileFactory.create_batch(5)
-
-        url = reverse("pricelens:cadence")
-        response = client.get(url, {"q": "54321"})
-
-        assert response.status_code == 200
-        assert len(response.context["profiles"]) == 2
-
-    def test_cadence_view_search_no_results(self, client, authenticated_user):
-        """Test a search query that returns no results."""
-        CadenceProfileFactory.create_batch(5)
-
-        url = reverse("pricelens:cadence")
-        response = client.get(url, {"q": "NON_EXISTENT_QUERY"})
-
-        assert response.status_code == 200
-        assert len(response.context["profiles"]) == 0
-
-    def test_cadence_view_search_with_bucket_filter(self, client, authenticated_user):
-        """Test that search and bucket filtering work together."""
-        supplier1 = SupplierFactory(name="Searchable Consistent")
-        supplier2 = SupplierFactory(name="Searchable Dead")
-        CadenceProfileFactory(supplier=supplier1, bucket=BucketChoices.CONSISTENT)
-        CadenceProfileFactory(supplier=supplier2, bucket=BucketChoices.DEAD)
-        CadenceProfileFactory.create_batch(5, bucket=BucketChoices.CONSISTENT)
-
-        url = reverse("pricelens:cadence")
-        response = client.get(url, {"q": "Searchable", "bucket": "consistent"})
-
+        with django_assert_num_queries(CADENCE_PAGE_QUERIES):
+            response = client.get(url + "?page=2")
         assert response.status_code == 200
         assert len(response.context["profiles"]) == 1
-        assert response.context["profiles"][0].supplier.name == "Searchable Consistent"
-
-    def test_cadence_view_search_supid_greater_than(self, client, authenticated_user):
-        for i in range(5):
-            CadenceProfileFactory(supplier=SupplierFactory(supid=100 + i))
-        url = reverse("pricelens:cadence")
-        response = client.get(url, {"q": ">102"})
-        assert response.status_code == 200
-        assert len(response.context["profiles"]) == 2
-
-    def test_cadence_view_search_supid_less_than(self, client, authenticated_user):
-        for i in range(5):
-            CadenceProfileFactory(supplier=SupplierFactory(supid=200 + i))
-        url = reverse("pricelens:cadence")
-        response = client.get(url, {"q": "<203"})
-        assert response.status_code == 200
-        assert len(response.context["profiles"]) == 3
-
-    def test_cadence_view_search_supid_gte(self, client, authenticated_user):
-        for i in range(5):
-            CadenceProfileFactory(supplier=SupplierFactory(supid=300 + i))
-        url = reverse("pricelens:cadence")
-        response = client.get(url, {"q": ">=302"})
-        assert response.status_code == 200
-        assert len(response.context["profiles"]) == 3
-
-    def test_cadence_view_search_supid_lte(self, client, authenticated_user):
-        for i in range(5):
-            CadenceProfileFactory(supplier=SupplierFactory(supid=400 + i))
-        url = reverse("pricelens:cadence")
-        response = client.get(url, {"q": "<=402"})
-        assert response.status_code == 200
-        assert len(response.context["profiles"]) == 3
+        assert response.context["page_obj"].number == 2
 
-    def test_cadence_view_new_supplier_display(self, client, authenticated_user):
+    def test_cadence_view_new_supplier_display(self, urls, client, authenticated_user):
         """Test that a supplier in the 'new' bucket is displayed correctly."""
         new_profile = CadenceProfileFactory(
             bucket=BucketChoices.NEW,
@@ -295,7 +275,7 @@ class TestCadenceView:
             days_since_last=5,
         )
 
-        url = reverse("pricelens:cadence")
+        url = urls.cadence
         response = client.get(url)
 
         assert response.status_code == 200
@@ -305,15 +285,15 @@ class TestCadenceView:
         assert "новый" in content
         assert "badge-info" in content
 
-    def test_cadence_view_filter_by_new_bucket(self, client, authenticated_user):
+    def test_cadence_view_filter_by_new_bucket(self, urls, client, authenticated_user):
         """Test filtering by the 'new' bucket."""
-        CadenceProfileFactory.create_batch(5, bucket=BucketChoices.CONSISTENT)
-        CadenceProfileFactory.create_batch(3, bucket=BucketChoices.NEW)
+        create_cadence_profiles(5, bucket=BucketChoices.CONSISTENT)
+        create_cadence_profiles(3, bucket=BucketChoices.NEW)
 
-        url = reverse("pricelens:cadence")
+        url = urls.cadence
         response = client.get(url, {"bucket": "new"})
 
         assert response.status_code == 200
-        assert len(response.context["profiles"]) == 3
+        assert response.context["page_obj"].paginator.count == 3
         for profile in response.context["profiles"]:
             assert profile.bucket == BucketChoices.NEW